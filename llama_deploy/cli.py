@@ -281,13 +281,34 @@ def build_config(argv: Optional[List[str]] = None) -> Config:
 # `tokens` subcommand handlers
 # ---------------------------------------------------------------------------
 
+def _read_token_records(secrets: Path) -> list:
+    """
+    Parse tokens.jsonl, or a legacy tokens.json, without going through
+    TokenStore: its load migrates (and deletes) tokens.json, which a
+    read-only probe must not do. Returns [] if neither file can be read.
+    """
+    from llama_deploy.tokens import TokenRecord, _fold
+    try:
+        try:
+            return _fold((secrets / "tokens.jsonl").read_bytes())[0]
+        except FileNotFoundError:
+            pass
+        raw = json.loads((secrets / "tokens.json").read_text(encoding="utf-8"))
+        return [TokenRecord._from_dict(d) for d in raw.get("tokens", [])]
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        print(f"Warning: could not read token metadata in {secrets}: {e}", file=sys.stderr)
+        return []
+
+
 def _detect_auth_mode(base_dir: Path) -> AuthMode:
     """
     Infer token auth mode from on-disk artifacts.
 
     Priority:
       1) docker-compose.yml: presence of llama-auth sidecar → hashed
-      2) tokens.json record shape (active hashed record wins)
+      2) tokens.jsonl record shape (any hashed record wins)
       3) token_hashes.json (hashed) vs api_keys (plaintext) existence
       4) plaintext fallback for empty/new stores
 
@@ -304,16 +325,10 @@ def _detect_auth_mode(base_dir: Path) -> AuthMode:
             pass
 
     secrets = base_dir / "secrets"
-    token_file = secrets / "tokens.json"
 
-    if token_file.exists():
-        try:
-            data = json.loads(token_file.read_text(encoding="utf-8"))
-            for rec in data.get("tokens", []):
-                if rec.get("hash") and not rec.get("value"):
-                    return AuthMode.HASHED
-        except Exception:
-            pass
+    for rec in _read_token_records(secrets):
+        if rec.hash and not rec.value:
+            return AuthMode.HASHED
 
     hash_file = secrets / "token_hashes.json"
     key_file  = secrets / "api_keys"
@@ -342,7 +357,7 @@ def _tokens_list(base_dir: Path, auth_mode: AuthMode) -> None:
         f"{'ID':<{col_id}}  {'Name':<{col_name}}  {'Status':<{col_st}}  {'Created':<{col_date}}"
     )
     sep = "─" * len(header)
-    print(f"\nAPI Tokens  ({base_dir}/secrets/tokens.json)")
+    print(f"\nAPI Tokens  ({base_dir}/secrets/tokens.jsonl)")
     print(sep)
     print(header)
     print(sep)
@@ -399,16 +414,16 @@ def _tokens_revoke(base_dir: Path, token_id: str, auth_mode: AuthMode) -> None:
 
 def _tokens_sync(base_dir: Path, auth_mode: AuthMode) -> None:
     """
-    Re-sync keyfiles from tokens.json, then restart llama-server (plaintext mode only).
+    Re-sync keyfiles from tokens.jsonl, then restart llama-server (plaintext mode only).
 
     Plaintext mode:  rewrites api_keys from active tokens, restarts the llama
                      container so llama-server re-reads the file from disk.
-    Hashed mode:     rewrites token_hashes.json; sidecar picks it up on the next
-                     request — no restart needed.
+    Hashed mode:     rewrites token_hashes.json and token_hashes.sorted.bin;
+                     the sidecar picks them up at once — no restart needed.
     """
     from llama_deploy.tokens import TokenStore
     store = TokenStore(base_dir / "secrets", auth_mode=auth_mode)
-    store._sync()
+    store._sync(store.list_tokens())
     active = store.active_tokens()
 
     if auth_mode == AuthMode.HASHED:
@@ -566,7 +581,7 @@ def _dispatch_tokens(argv: List[str]) -> None:
     p_show.add_argument("id", metavar="TOKEN_ID", help="The tk_... ID to show.")
 
     sub.add_parser("sync",
-                   help="Re-sync keyfiles from tokens.json and restart llama-server "
+                   help="Re-sync keyfiles from tokens.jsonl and restart llama-server "
                         "(plaintext mode only; hashed mode takes effect immediately).")
 
     args = parser.parse_args(argv)
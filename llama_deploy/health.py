@@ -7,26 +7,53 @@ names in request bodies — no hardcoded "Qwen/Qwen3-8B" strings.
 
 from __future__ import annotations
 
+import http.client
 import json
+import os
+import select
+import subprocess
+import threading
 import time
 import urllib.error
+import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from llama_deploy.config import ModelSpec
-from llama_deploy.log import die, log_line, sh
+from llama_deploy.log import _TqdmStub, die, log_line, redact, sh
+
+# Rebound by orchestrator._ensure_tqdm() once tqdm is installed on first boot.
+try:
+    from tqdm import tqdm as TQDM
+except ImportError:
+    TQDM = _TqdmStub
+
+# Poll cadence for wait_health: start fast, back off while the model loads.
+_HEALTH_DELAY_MIN = 0.1
+_HEALTH_DELAY_MAX = 2.0
+
+# Smoke tests: chat on CPU can be slow; only the head of each body is shown.
+_SMOKE_TIMEOUT_S = 300
+_SMOKE_SNIPPET_BYTES = 800
 
 
 def wait_health(url: str, timeout_s: int = 300, bearer_token: str | None = None) -> None:
     """
     Poll /health until it returns HTTP 200 or the deadline expires.
 
+    A single keep-alive connection is reused across polls and the interval
+    backs off from 100 ms to 2 s, so a slow model load costs a handful of
+    requests rather than one fresh TCP handshake per second. While the port
+    is still refusing connections the interval stays at the minimum so the
+    first successful bind is noticed quickly.
+
     Diagnostic hints are emitted at regular intervals so a stalled step is
     immediately actionable rather than silently timing out.  Hint intervals:
       30 s  — suggest checking docker logs
       60 s  — show live container status
       120 s — dump recent logs + port bindings
     """
-    from tqdm import tqdm
 
     HINT_INTERVALS = {
         30:  "[WAIT] Still waiting… Check container logs: docker logs --tail 40 llama-router",
@@ -35,54 +62,74 @@ def wait_health(url: str, timeout_s: int = 300, bearer_token: str | None = None)
     }
     hint_shown: set = set()
 
+    parts = urllib.parse.urlsplit(url)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = conn_cls(parts.hostname, parts.port, timeout=3)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    headers = {"Authorization": f"Bearer {bearer_token}"} if bearer_token else {}
+
     deadline = time.time() + timeout_s
     start = time.time()
-    last_tick = start
-    with tqdm(total=timeout_s, desc="Waiting for /health", unit="s") as bar:
-        while time.time() < deadline:
-            try:
-                req = urllib.request.Request(url)
-                if bearer_token:
-                    req.add_header("Authorization", f"Bearer {bearer_token}")
-                with urllib.request.urlopen(req, timeout=3) as resp:
+    shown = 0
+    delay = _HEALTH_DELAY_MIN
+    try:
+        with TQDM(total=timeout_s, desc="Waiting for /health", unit="s") as bar:
+            while time.time() < deadline:
+                try:
+                    conn.request("GET", path, headers=headers)
+                    resp = conn.getresponse()
+                    resp.read()  # drain so the socket can be reused
                     if resp.status == 200:
-                        tqdm.write("[OK] /health returned 200")
+                        TQDM.write("[OK] /health returned 200")
                         log_line("[OK] /health returned 200")
                         return
-            except urllib.error.HTTPError:
-                pass
-            except Exception:
-                pass
-
-            elapsed = int(time.time() - start)
-            for threshold, hint in HINT_INTERVALS.items():
-                if elapsed >= threshold and threshold not in hint_shown:
-                    hint_shown.add(threshold)
-                    tqdm.write(hint)
-                    log_line(hint)
-                    if threshold == 60:
-                        sh("docker ps --format 'table {{.Names}}\\t{{.Status}}\\t{{.Ports}}'",
-                           check=False)
-                    elif threshold == 120:
-                        sh("docker logs --tail 60 llama-router", check=False)
-                        sh("ss -lntp | head -30", check=False)
-
-            now = time.time()
-            step = int(now - last_tick)
-            if step > 0:
-                bar.update(step)
-                last_tick = now
-            time.sleep(1)
-
-    # Deadline expired — emit rich diagnostics before dying
-    tqdm.write("[ERROR] /health did not return 200 within the timeout.")
+                    delay = min(delay * 1.5, _HEALTH_DELAY_MAX)
+                except ConnectionRefusedError:
+                    # Nothing is listening yet; keep polling at the fast rate.
+                    conn.close()
+                    delay = _HEALTH_DELAY_MIN
+                except Exception:
+                    conn.close()
+                    delay = min(delay * 1.5, _HEALTH_DELAY_MAX)
+
+                elapsed = int(time.time() - start)
+                for threshold, hint in HINT_INTERVALS.items():
+                    if elapsed >= threshold and threshold not in hint_shown:
+                        hint_shown.add(threshold)
+                        TQDM.write(hint)
+                        log_line(hint)
+                        if threshold == 60:
+                            sh("docker ps --format 'table {{.Names}}\\t{{.Status}}\\t{{.Ports}}'",
+                               check=False)
+                        elif threshold == 120:
+                            sh("docker logs --tail 60 llama-router", check=False)
+                            sh("ss -lntp | head -30", check=False)
+
+                # Advance the bar by whole seconds of wall clock actually spent.
+                elapsed = min(int(time.time() - start), timeout_s)
+                if elapsed > shown:
+                    bar.update(elapsed - shown)
+                    shown = elapsed
+                time.sleep(max(0.0, min(delay, deadline - time.time())))
+    finally:
+        conn.close()
+
+    _die_unhealthy(timeout_s)
+
+
+def _die_unhealthy(timeout_s: int) -> None:
+    """Emit rich diagnostics for a health wait that ran out of time, then die."""
+
+    TQDM.write("[ERROR] /health did not return 200 within the timeout.")
     log_line(f"[ERROR] /health timeout after {timeout_s}s")
-    tqdm.write("[DIAG] Container status:")
+    TQDM.write("[DIAG] Container status:")
     sh("docker ps -a --format 'table {{.Names}}\\t{{.Image}}\\t{{.Status}}\\t{{.Ports}}'",
        check=False)
-    tqdm.write("[DIAG] Recent logs (last 80 lines):")
+    TQDM.write("[DIAG] Recent logs (last 80 lines):")
     sh("docker logs --tail 80 llama-router", check=False)
-    tqdm.write("[DIAG] Port bindings:")
+    TQDM.write("[DIAG] Port bindings:")
     sh("ss -lntp", check=False)
     die(
         f"Service did not become healthy within {timeout_s}s.\n"
@@ -94,11 +141,118 @@ def wait_health(url: str, timeout_s: int = 300, bearer_token: str | None = None)
     )
 
 
+def wait_health_via_docker_events(container: str = "llama-router", timeout_s: int = 300) -> bool:
+    """
+    Block until Docker reports the container's HEALTHCHECK as healthy.
+
+    Subscribes to `docker events` for health_status transitions instead of
+    polling /health, so the wait ends as soon as Docker's own check passes.
+    Docker only emits health_status on a change, and a subscription is not
+    live the moment Popen returns, so the stream is opened with --since set
+    to just before the status was inspected: a transition in between is
+    replayed rather than missed.
+
+    Returns True once healthy. Returns False when the event stream cannot be
+    used (docker missing, daemon error, container without a healthcheck) so
+    the caller can fall back to wait_health(). Dies with diagnostics when the
+    deadline expires.
+    """
+
+    since = int(time.time())  # whole seconds, rounded down: replays a little extra
+    try:
+        status = subprocess.run(
+            ["docker", "inspect", "-f", "{{if .State.Health}}{{.State.Health.Status}}{{end}}", container],
+            capture_output=True,
+            text=True,
+            check=False,
+        ).stdout.strip()
+    except OSError:
+        return False
+    if not status:
+        # No healthcheck declared (or container missing): nothing to wait on.
+        return False
+    if status == "healthy":
+        TQDM.write(f"[OK] {container} reported healthy")
+        log_line(f"[OK] docker events: {container} reported healthy")
+        return True
+
+    try:
+        proc = subprocess.Popen(
+            [
+                "docker", "events",
+                "--since", str(since),
+                "--format", "{{json .}}",
+                "--filter", f"container={container}",
+                "--filter", "event=health_status",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except OSError:
+        return False
+
+    timed_out = threading.Event()
+
+    def _expire() -> None:
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout_s, _expire)
+    timer.daemon = True
+    timer.start()
+    try:
+        TQDM.write(f"[WAIT] Waiting for Docker healthcheck on {container} (status={status})")
+        log_line(f"[WAIT] docker events: {container} status={status}")
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                continue
+            if (obj.get("status") or obj.get("Action")) == "health_status: healthy":
+                TQDM.write(f"[OK] {container} reported healthy")
+                log_line(f"[OK] docker events: {container} reported healthy")
+                return True
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+    if timed_out.is_set():
+        _die_unhealthy(timeout_s)
+    return False
+
+
+def _smoke_request(
+    base_url: str,
+    token: str,
+    method: str,
+    path: str,
+    payload: Optional[dict],
+) -> Tuple[Optional[int], bytes, Optional[str]]:
+    """Issue one smoke-test request; returns (status, body, error)."""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(f"{base_url}{path}", data=data, method=method)
+    req.add_header("Authorization", f"Bearer {token}")
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(req, timeout=_SMOKE_TIMEOUT_S) as resp:
+            return resp.status, resp.read(), None
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), f"HTTP {e.code}"
+    except Exception as e:
+        return None, b"", str(e)
+
+
 def curl_smoke_tests(
     base_url: str,
     token: str,
     llm: ModelSpec,
     emb: ModelSpec,
+    models_max: int = 2,
 ) -> None:
     """
     Run three smoke tests against the OpenAI-compatible API.
@@ -106,37 +260,88 @@ def curl_smoke_tests(
     Model names come from spec.effective_alias so they match what the server
     advertises in /v1/models — regardless of which HF repo was used.
     Fixes Bug 2 (hardcoded Qwen model names in the original script).
+
+    The requests are independent, so they are issued concurrently from this
+    process (no bash/curl subprocesses); the step takes as long as the slowest
+    route rather than the sum of all three. With models_max < 2 the router can
+    hold only one model, so they are sent one at a time instead of making it
+    evict and reload between chat and embeddings. The first 800 bytes of each
+    response are shown; failures are reported as warnings, not fatal.
     """
-    log_line(f"[SMOKE] Starting smoke tests against {base_url}")
 
-    # 1. Model listing
-    sh(
-        f'curl -fsS "{base_url}/v1/models" '
-        f'-H "Authorization: Bearer {token}" | head -c 800'
-    )
+    log_line(f"[SMOKE] Starting smoke tests against {base_url}")
 
-    # 2. Embeddings
-    emb_payload = json.dumps({"model": emb.effective_alias, "input": ["hello world"]})
-    sh(
-        f'curl -fsS "{base_url}/v1/embeddings" '
-        f'-H "Authorization: Bearer {token}" '
-        f'-H "Content-Type: application/json" '
-        f"-d '{emb_payload}' | head -c 800"
-    )
+    checks: List[Tuple[str, str, Optional[dict]]] = [
+        # 1. Model listing
+        ("GET", "/v1/models", None),
+        # 2. Embeddings
+        ("POST", "/v1/embeddings", {"model": emb.effective_alias, "input": ["hello world"]}),
+        # 3. Chat completion
+        ("POST", "/v1/chat/completions", {
+            "model": llm.effective_alias,
+            "messages": [{"role": "user", "content": "Say hello in 5 words."}],
+            "max_tokens": 64,
+            "temperature": 0.2,
+        }),
+    ]
+
+    with ThreadPoolExecutor(max_workers=len(checks) if models_max >= 2 else 1) as ex:
+        results = list(ex.map(lambda c: _smoke_request(base_url, token, *c), checks))
+
+    failures: List[str] = []
+    for (method, path, _payload), (status, body, err) in zip(checks, results):
+        header = f"\n$ {method} {base_url}{path} -> {status if status is not None else 'no response'}"
+        TQDM.write(header)
+        log_line(header)
+        snippet = body[:_SMOKE_SNIPPET_BYTES].decode("utf-8", errors="replace")
+        if snippet:
+            TQDM.write(snippet)
+            log_line(redact(snippet))
+        if err is not None:
+            failures.append(f"{method} {path}: {err}")
+
+    if failures:
+        msg = "[WARN] Smoke tests failed (deployment left running):\n  " + "\n  ".join(failures)
+        TQDM.write(msg)
+        log_line(msg)
+
+
+def internal_smoke_test(runner_network: str, router_target: str, token: str) -> None:
+    """
+    Probe /health and /v1/models from a throwaway curl container.
 
-    # 3. Chat completion
-    chat_payload = json.dumps({
-        "model": llm.effective_alias,
-        "messages": [{"role": "user", "content": "Say hello in 5 words."}],
-        "max_tokens": 64,
-        "temperature": 0.2,
-    })
-    sh(
-        f'curl -fsS "{base_url}/v1/chat/completions" '
-        f'-H "Authorization: Bearer {token}" '
-        f'-H "Content-Type: application/json" '
-        f"-d '{chat_payload}' | head -c 800"
+    Used when the API is not published on the host, so the requests have to
+    originate inside the Docker network. Output is captured and truncated
+    here rather than piped through `head` in a host-side bash; stderr is
+    only shown (its tail) when the probe fails.
+    """
+    probe = (
+        f"curl -fsS http://{router_target}:8080/health && "
+        f"curl -fsS http://{router_target}:8080/v1/models "
+        f"-H 'Authorization: Bearer {token}'"
     )
+    argv = [
+        "docker", "run", "--rm", "--network", runner_network,
+        "curlimages/curl:8.5.0", "sh", "-c", probe,
+    ]
+    header = redact("\n$ " + " ".join(argv))
+    TQDM.write(header)
+    log_line(header)
+
+    # stderr is kept apart: on a first run docker's image pull progress lands
+    # there and would otherwise crowd the curl responses out of the snippet.
+    proc = subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    snippet = proc.stdout[:_SMOKE_SNIPPET_BYTES].decode("utf-8", errors="replace")
+    if snippet:
+        TQDM.write(snippet)
+        log_line(redact(snippet))
+    if proc.returncode != 0:
+        # curl -S errors come last, after any pull output.
+        errors = proc.stderr[-_SMOKE_SNIPPET_BYTES:].decode("utf-8", errors="replace")
+        if errors:
+            TQDM.write(errors)
+            log_line(redact(errors))
+        die(f"Internal smoke test failed (exit {proc.returncode}) on network {runner_network}")
 
 
 def profile_smoke_checks(cfg) -> None:
@@ -150,12 +355,11 @@ def profile_smoke_checks(cfg) -> None:
     Results are logged but never fatal — this is diagnostic, not blocking.
     """
     from llama_deploy.config import AccessProfile
-    from tqdm import tqdm
 
     net = cfg.network
     profile = net.access_profile
 
-    tqdm.write(f"[SMOKE] Profile check: profile={profile.value}  port={net.port}")
+    TQDM.write(f"[SMOKE] Profile check: profile={profile.value}  port={net.port}")
     log_line(f"[SMOKE] Profile check: profile={profile.value}  port={net.port}")
 
     # Check 1: Docker port binding
@@ -170,28 +374,86 @@ def profile_smoke_checks(cfg) -> None:
 
     if profile in (AccessProfile.LOCALHOST, AccessProfile.VPN_ONLY, AccessProfile.HOME_PRIVATE):
         if rc_all == 0:
-            tqdm.write(f"[SMOKE] FAIL: port {net.port} exposed on 0.0.0.0 — should be loopback only.")
+            TQDM.write(f"[SMOKE] FAIL: port {net.port} exposed on 0.0.0.0 — should be loopback only.")
             log_line(f"[SMOKE] FAIL: port {net.port} exposed on 0.0.0.0 (profile={profile.value}).")
         elif rc_lo == 0:
-            tqdm.write(f"[SMOKE] OK: port {net.port} bound to 127.0.0.1 only.")
+            TQDM.write(f"[SMOKE] OK: port {net.port} bound to 127.0.0.1 only.")
             log_line(f"[SMOKE] OK: port {net.port} on loopback (profile={profile.value}).")
         else:
-            tqdm.write(f"[SMOKE] WARN: port {net.port} not found on any interface — container may not be up yet.")
+            TQDM.write(f"[SMOKE] WARN: port {net.port} not found on any interface — container may not be up yet.")
 
     elif profile == AccessProfile.PUBLIC:
         if net.open_firewall and rc_all == 0:
-            tqdm.write(f"[SMOKE] OK: port {net.port} exposed on 0.0.0.0 (public profile, open_firewall=True).")
+            TQDM.write(f"[SMOKE] OK: port {net.port} exposed on 0.0.0.0 (public profile, open_firewall=True).")
             log_line(f"[SMOKE] OK: port {net.port} public as expected.")
         elif rc_lo == 0:
-            tqdm.write(f"[SMOKE] OK: port {net.port} on loopback (public profile with NGINX).")
+            TQDM.write(f"[SMOKE] OK: port {net.port} on loopback (public profile with NGINX).")
             log_line(f"[SMOKE] OK: port {net.port} on loopback for NGINX proxy.")
         else:
-            tqdm.write(f"[SMOKE] WARN: port {net.port} not found — check Docker compose logs.")
+            TQDM.write(f"[SMOKE] WARN: port {net.port} not found — check Docker compose logs.")
 
     # Check 2: UFW status (informational only)
     sh("ufw status numbered 2>/dev/null | head -30 || true", check=False)
 
 
+def _run_concurrent(cmds: List[Tuple[str, List[str], Optional[int]]]) -> Dict[str, List[str]]:
+    """
+    Run independent diagnostic commands side by side and stream their output.
+
+    Each entry is (tag, argv, max_lines). The commands are exec'd directly
+    (no login shell) and all pipes are drained from one select() loop, so the
+    total wait is the slowest command rather than the sum. Lines are echoed as
+    "[tag] line" (at most max_lines per command, None for all) and returned
+    per tag in full. A command that cannot be started yields no lines.
+    """
+
+    procs: Dict[int, Tuple[str, subprocess.Popen]] = {}
+    pending: Dict[int, bytes] = {}
+    lines: Dict[str, List[str]] = {tag: [] for tag, _, _ in cmds}
+    limits = {tag: limit for tag, _, limit in cmds}
+
+    def _emit(tag: str, raw: bytes) -> None:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r")
+        lines[tag].append(line)
+        limit = limits[tag]
+        if limit is None or len(lines[tag]) <= limit:
+            TQDM.write(f"[{tag}] {line}")
+            log_line(redact(f"[{tag}] {line}"))
+
+    for tag, argv, _ in cmds:
+        log_line(f"$ {' '.join(argv)}")
+        try:
+            proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError as e:
+            log_line(f"[WARN] sanity: {argv[0]} unavailable: {e}")
+            continue
+        assert proc.stdout is not None
+        fd = proc.stdout.fileno()
+        procs[fd] = (tag, proc)
+        pending[fd] = b""
+
+    open_fds = list(procs)
+    while open_fds:
+        ready, _, _ = select.select(open_fds, [], [])
+        for fd in ready:
+            tag, _ = procs[fd]
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                open_fds.remove(fd)
+                if pending[fd]:
+                    _emit(tag, pending[fd])
+                continue
+            *complete, pending[fd] = (pending[fd] + chunk).split(b"\n")
+            for raw in complete:
+                _emit(tag, raw)
+
+    for tag, proc in procs.values():
+        proc.wait()
+        proc.stdout.close()
+        log_line(f"[{tag}] exit={proc.returncode}")
+    return lines
+
+
 def sanity_checks(cfg) -> None:
     """
     Docker status, recent logs, and port-binding verification.
@@ -206,30 +468,27 @@ def sanity_checks(cfg) -> None:
     """
     from llama_deploy.config import AccessProfile
 
-    sh(
-        "docker ps --format 'table {{.Names}}\t{{.Image}}\t{{.Status}}\t{{.Ports}}' "
-        "| sed -n '1,30p'",
-        check=False,
-    )
-    sh("docker logs --tail 200 llama-router || true", check=False)
-    sh("ss -lntp | sed -n '1,200p'", check=False)
+    out = _run_concurrent([
+        ("docker-ps",
+         ["docker", "ps", "--format", "table {{.Names}}\t{{.Image}}\t{{.Status}}\t{{.Ports}}"],
+         30),
+        ("docker-logs", ["docker", "logs", "--tail", "200", "llama-router"], None),
+        ("ss", ["ss", "-lntp"], 200),
+    ])
 
     net = cfg.network
     profile = net.access_profile
 
     if profile in (AccessProfile.LOCALHOST, AccessProfile.VPN_ONLY, AccessProfile.HOME_PRIVATE):
-        # Verify no accidental 0.0.0.0 / [::] exposure (grep exits 0 when it finds a match)
-        rc = sh(
-            f"ss -lntp | grep -E '0\\.0\\.0\\.0:{net.port}\\b|\\[::\\]:{net.port}\\b'",
-            check=False,
-        )
-        if rc == 0:
+        # Verify no accidental 0.0.0.0 / [::] exposure on the ss output we already have.
+        wildcard = {f"0.0.0.0:{net.port}", f"[::]:{net.port}", f"*:{net.port}"}
+        exposed = any(wildcard.intersection(line.split()) for line in out["ss"])
+        if exposed:
             log_line(
                 f"[WARN] sanity: port {net.port} appears on 0.0.0.0/[::] "
                 f"despite profile={profile.value}. Check Docker port mapping."
             )
-            from tqdm import tqdm
-            tqdm.write(
+            TQDM.write(
                 f"[WARN] Port {net.port} is exposed on 0.0.0.0 — "
                 f"unexpected for profile={profile.value}. "
                 "Verify docker-compose.yml ports binding."
@@ -7,49 +7,166 @@ imported by everything else without creating circular dependencies.
 
 from __future__ import annotations
 
+import atexit
 import os
 import re
+import selectors
 import signal
 import subprocess
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, TextIO
 
 LOG_PATH = Path("/var/log/llamacpp_deploy.log")
 
-# Redact tokens from on-screen output and log
-REDACT_PATTERNS = [
-    re.compile(r"(Authorization:\s*Bearer\s+)[^\s\"']+", re.IGNORECASE),
-    re.compile(r"(x-api-key:\s*)[^\s\"']+", re.IGNORECASE),
-    re.compile(r"(HF_TOKEN=)[^\s]+"),
-    re.compile(r"(--hf-token\s+)[^\s]+"),
-]
+# sh() reads child output in chunks of this size
+_READ_CHUNK = 1 << 16
+
+# sh() batches on-screen output and repaints at most this often (seconds)
+_DISPLAY_INTERVAL_S = 0.2
+
+# On Ctrl-C, sh() gives the child's process group this long to exit after
+# SIGTERM, then sends SIGKILL and waits a little more (seconds)
+_TERM_GRACE_S = 3
+_KILL_GRACE_S = 2
+
+# Redact tokens from on-screen output and log.
+# One alternation scanned once per line instead of one pass per pattern; each
+# named group captures the prefix that is kept in front of "<REDACTED>".
+_REDACT_RE = re.compile(
+    "|".join([
+        r"(?P<auth>(?i:Authorization:\s*Bearer\s+))[^\s\"']+",
+        r"(?P<apikey>(?i:x-api-key:\s*))[^\s\"']+",
+        r"(?P<hftoken>HF_TOKEN=)[^\s]+",
+        r"(?P<hfflag>--hf-token\s+)[^\s]+",
+    ])
+)
+
+
+class _TqdmStub:
+    """Fallback progress helper when tqdm is not available yet."""
+
+    def __init__(self, total: int = 0, desc: str = "", unit: str = "") -> None:
+        self.total = total
+        self.desc = desc
+        self.unit = unit
+
+    @staticmethod
+    def write(msg: str) -> None:
+        print(msg, flush=True)
+
+    def update(self, _n: int = 1) -> None:
+        return
+
+    def __enter__(self) -> "_TqdmStub":
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb) -> bool:
+        return False
+
+
+# Resolved once at import; orchestrator._ensure_tqdm() rebinds it after a
+# first-boot install so sh() stops printing through the stub.
+try:
+    from tqdm import tqdm as TQDM
+except ImportError:
+    TQDM = _TqdmStub
+
+
+# Same patterns over raw bytes, so sh() can redact child output without a
+# decode/encode round trip on its way to the log file.
+_REDACT_RE_B = re.compile(_REDACT_RE.pattern.encode("ascii"))
 
 
 def redact(s: str) -> str:
-    out = s
-    for pat in REDACT_PATTERNS:
-        out = pat.sub(r"\1<REDACTED>", out)
-    return out
+    return _REDACT_RE.sub(lambda m: m.group(m.lastgroup) + "<REDACTED>", s)
+
+
+def _redact_bytes(b: bytes) -> bytes:
+    return _REDACT_RE_B.sub(lambda m: m.group(m.lastgroup) + b"<REDACTED>", b)
+
+
+# Opened once per process (line-buffered) rather than once per log_line call;
+# sh() logs every line of child output, so this sits on a hot path.
+_LOG_FH: Optional[TextIO] = None
+_LOG_FH_PATH: Optional[Path] = None
+_LOG_FH_LOCK = threading.Lock()
+
+
+def _close_log_fh() -> None:
+    global _LOG_FH
+    if _LOG_FH is not None:
+        _LOG_FH.close()
+        _LOG_FH = None
+
+
+def _get_log_fh() -> TextIO:
+    global _LOG_FH, _LOG_FH_PATH
+    with _LOG_FH_LOCK:
+        if _LOG_FH is None or _LOG_FH_PATH != LOG_PATH:
+            _close_log_fh()
+            LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            _LOG_FH = LOG_PATH.open("a", buffering=1, encoding="utf-8")
+            _LOG_FH_PATH = LOG_PATH
+        return _LOG_FH
+
+
+atexit.register(_close_log_fh)
 
 
 def log_line(s: str) -> None:
-    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with LOG_PATH.open("a", encoding="utf-8") as f:
-        f.write(s + "\n")
+    _get_log_fh().write(s + "\n")
 
 
 def die(msg: str, code: int = 1) -> None:
-    # Import tqdm lazily to avoid a hard boot-time dependency
     try:
-        from tqdm import tqdm
-        tqdm.write(f"[FATAL] {msg}")
+        TQDM.write(f"[FATAL] {msg}")
     except Exception:
         print(f"[FATAL] {msg}", file=sys.stderr, flush=True)
     log_line(f"[FATAL] {msg}")
     sys.exit(code)
 
 
+# ---------------------------------------------------------------------------
+# Cancellation of parallel steps
+# ---------------------------------------------------------------------------
+
+class Cancelled(BaseException):
+    """
+    Raised in a worker thread whose parallel group was aborted (Ctrl-C, or a
+    sibling step failing). A BaseException so `except Exception` handlers
+    around downloads do not report it as a failure.
+    """
+
+
+# Each worker thread of a parallel group holds that group's cancel Event;
+# the main thread holds none and is never cancelled this way.
+_worker = threading.local()
+
+
+def set_cancel_event(event: Optional[threading.Event]) -> None:
+    _worker.cancel = event
+
+
+def in_parallel_group() -> bool:
+    """True in a worker thread of a parallel group (it must not prompt)."""
+    return getattr(_worker, "cancel", None) is not None
+
+
+def cancelled() -> bool:
+    """True once the parallel group running this thread has been aborted."""
+    event = getattr(_worker, "cancel", None)
+    return event is not None and event.is_set()
+
+
+def check_cancelled() -> None:
+    """Raise Cancelled if cancelled(); long-running loops poll this."""
+    if cancelled():
+        raise Cancelled()
+
+
 def sh(
     cmd: str,
     *,
@@ -57,34 +174,83 @@ def sh(
     env: Optional[Dict[str, str]] = None,
 ) -> int:
     """Run a bash command, stream stdout/stderr, log everything (redacted)."""
-    from tqdm import tqdm  # imported here; tqdm is guaranteed present by orchestrator boot
-
     safe_cmd = redact(cmd)
-    tqdm.write(f"\n$ {safe_cmd}")
+    TQDM.write(f"\n$ {safe_cmd}")
     log_line(f"\n$ {safe_cmd}")
 
     proc = subprocess.Popen(
         ["bash", "-lc", cmd],
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,
         env=env,
-        preexec_fn=os.setsid,  # kill whole process group on Ctrl-C
+        start_new_session=True,  # own process group, so Ctrl-C can killpg it
     )
 
+    # Child output goes to the log as bytes through a raw O_APPEND fd (one
+    # os.write per chunk of finished lines, redacted line by line); the
+    # terminal copy is decoded and repainted at most every 200 ms.
+    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    log_fd = os.open(str(LOG_PATH), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    shown: list = []
+    last_paint = 0.0
+
+    def _emit(lines: list, *, force: bool = False) -> None:
+        nonlocal last_paint
+        if lines:
+            lines = [raw.rstrip(b"\r") for raw in lines]
+            os.write(log_fd, b"".join(_redact_bytes(raw) + b"\n" for raw in lines))
+            shown.extend(lines)
+        now = time.monotonic()
+        if shown and (force or now - last_paint >= _DISPLAY_INTERVAL_S):
+            TQDM.write(b"\n".join(shown).decode("utf-8", errors="replace"))
+            shown.clear()
+            last_paint = now
+
+    # Read the pipe in 64 KiB chunks via a short select timeout instead of a
+    # blocking readline loop: fewer syscalls on chatty commands (docker pull,
+    # apt) and the loop wakes regularly, so Ctrl-C is handled promptly.
+    assert proc.stdout is not None
+    fd = proc.stdout.fileno()
+    os.set_blocking(fd, False)
+    sel = selectors.DefaultSelector()
+    sel.register(fd, selectors.EVENT_READ)
+    pending = b""
     try:
-        assert proc.stdout is not None
-        for line in proc.stdout:
-            line = line.rstrip("\n")
-            tqdm.write(line)
-            log_line(redact(line))
-    except KeyboardInterrupt:
-        tqdm.write("[WARN] Ctrl-C received. Terminating command...")
+        while True:
+            # A docker pull in a parallel group runs on a worker thread, which
+            # never sees KeyboardInterrupt; the group's cancel Event stands in.
+            check_cancelled()
+            if not sel.select(timeout=0.1):
+                _emit([])
+                continue
+            try:
+                chunk = os.read(fd, _READ_CHUNK)
+            except BlockingIOError:
+                continue
+            if not chunk:
+                break
+            *lines, pending = (pending + chunk).split(b"\n")
+            _emit(lines)
+        _emit([pending] if pending else [], force=True)
+    except (KeyboardInterrupt, Cancelled) as e:
+        _emit([], force=True)
+        reason = "Ctrl-C received" if isinstance(e, KeyboardInterrupt) else "Step cancelled"
+        TQDM.write(f"[WARN] {reason}. Terminating command...")
         try:
             os.killpg(proc.pid, signal.SIGTERM)
+            try:
+                proc.wait(timeout=_TERM_GRACE_S)
+            except subprocess.TimeoutExpired:
+                # e.g. apt/dpkg ignoring SIGTERM: escalate so the group is reaped.
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait(timeout=_KILL_GRACE_S)
         except Exception:
             pass
         raise
+    finally:
+        sel.close()
+        proc.stdout.close()
+        os.close(log_fd)
 
     rc = proc.wait()
     if check and rc != 0:
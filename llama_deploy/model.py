@@ -14,16 +14,18 @@ from __future__ import annotations
 import datetime as dt
 import hashlib
 import json
+import os
 import re
 import shutil
 import sys
+import threading
 import urllib.error
 import urllib.request
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
 from llama_deploy.config import ModelSpec
-from llama_deploy.log import die, log_line
+from llama_deploy.log import check_cancelled, die, in_parallel_group, log_line
 
 _METADATA_FALLBACK_REPOS = {
     # Some mirrors expose LFS metadata even when the upstream repo does not.
@@ -38,6 +40,10 @@ _KNOWN_INCONSISTENT_API_SHA_REPOS = {
 }
 _SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
 
+# LLM and embedding downloads run concurrently; hold this around any
+# interactive prompt so two questions never share the terminal.
+prompt_lock = threading.RLock()
+
 
 def _normalize_sha256(raw: Optional[str]) -> Optional[str]:
     if not raw:
@@ -88,17 +94,25 @@ def _confirm_trust_unverified(
             "Re-run with --allow-unverified-downloads to proceed."
         )
         return False
+    if in_parallel_group():
+        # A worker blocked in input() would outlive an aborted group.
+        tqdm.write(
+            "[WARN] Cannot ask while downloads run in parallel: refusing unverified download. "
+            "Re-run with --allow-unverified-downloads to proceed."
+        )
+        return False
 
-    tqdm.write(f"[WARN] File: {repo}@{revision[:12]} / {filename}")
-    while True:
-        try:
-            ans = input("Trust this download and continue? [y/N]: ").strip().lower()
-        except (EOFError, KeyboardInterrupt):
-            return False
-        if ans in ("y", "yes"):
-            return True
-        if ans in ("", "n", "no"):
-            return False
+    with prompt_lock:
+        tqdm.write(f"[WARN] File: {repo}@{revision[:12]} / {filename}")
+        while True:
+            try:
+                ans = input("Trust this download and continue? [y/N]: ").strip().lower()
+            except (EOFError, KeyboardInterrupt):
+                return False
+            if ans in ("y", "yes"):
+                return True
+            if ans in ("", "n", "no"):
+                return False
 
 
 # ---------------------------------------------------------------------------
@@ -201,13 +215,55 @@ def pick_hf_file(meta: Dict[str, Any], spec: ModelSpec) -> Tuple[str, Optional[i
 # ---------------------------------------------------------------------------
 
 def sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
     with path.open("rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
         for chunk in iter(lambda: f.read(1024 * 1024), b""):
             h.update(chunk)
     return h.hexdigest()
 
 
+def _sha256_sidecar(path: Path) -> Path:
+    return path.with_suffix(path.suffix + ".sha256")
+
+
+def write_sha256_sidecar(path: Path, sha256: str) -> None:
+    """
+    Record sha256 next to path in `sha256sum` format (atomic replace).
+
+    Best effort: a read-only models dir only costs a re-hash next time.
+    """
+    sidecar = _sha256_sidecar(path)
+    tmp = sidecar.with_suffix(sidecar.suffix + ".tmp")
+    try:
+        tmp.write_text(f"{sha256.lower()}  {path.name}\n", encoding="utf-8")
+        os.replace(tmp, sidecar)
+    except OSError as e:
+        log_line(f"[WARN] Could not write {sidecar.name}: {e}")
+
+
+def sha256_file_cached(path: Path) -> str:
+    """
+    Like sha256_file(), but memoized in a <file>.sha256 sidecar.
+
+    The sidecar is trusted only if it is at least as new as the file and
+    holds a well-formed digest; otherwise the file is hashed again and the
+    sidecar rewritten. Re-runs therefore skip re-reading multi-GB GGUFs.
+    """
+    sidecar = _sha256_sidecar(path)
+    try:
+        if sidecar.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            cached = sidecar.read_text(encoding="utf-8").split(maxsplit=1)
+            if cached and _SHA256_RE.fullmatch(cached[0]):
+                return cached[0].lower()
+    except OSError:
+        pass
+    sha = sha256_file(path)
+    write_sha256_sidecar(path, sha)
+    return sha
+
+
 def ensure_disk_space(dst_dir: Path, required_bytes: int, headroom: float = 1.20) -> None:
     usage = shutil.disk_usage(dst_dir)
     need = int(required_bytes * headroom)
@@ -244,7 +300,10 @@ def download_hf_file(
 
     # If file already exists and it can be validated, keep it.
     if dst.exists():
-        got = sha256_file(dst)
+        # Verification reads every byte: the stat-keyed .sha256 sidecar cannot
+        # catch a file replaced with the same size and mtime. It is only good
+        # enough for the reference hash shown when upstream has none.
+        got = sha256_file(dst) if expected_sha256 else sha256_file_cached(dst)
         got_size = dst.stat().st_size
         if expected_sha256:
             if got.lower() == expected_sha256.lower():
@@ -275,9 +334,9 @@ def download_hf_file(
         elif part_size == expected_size:
             part_sha = sha256_file(part)
             if part_sha.lower() == expected_sha256.lower():
-                import os
                 part.replace(dst)
                 os.chmod(dst, 0o644)
+                write_sha256_sidecar(dst, part_sha)
                 tqdm.write(f"[OK] Reused complete {part.name}, sha256 verified.")
                 return part_sha, expected_size
             tqdm.write(f"[WARN] Discarding stale {part.name}; checksum does not match expected revision.")
@@ -318,6 +377,7 @@ def download_hf_file(
                  desc=f"Downloading {dst.name}",
              ) as bar:
             while True:
+                check_cancelled()  # the .part file is kept for a later resume
                 chunk = resp.read(1024 * 1024)
                 if not chunk:
                     break
@@ -362,9 +422,9 @@ def download_hf_file(
                 )
             trusted_unverified = True
 
-    import os
     part.replace(dst)
     os.chmod(dst, 0o644)
+    write_sha256_sidecar(dst, got_sha)
     if expected_sha256 and not trusted_unverified:
         tqdm.write(f"[OK] Downloaded {dst.name} — sha256 verified ({got_sha[:12]}...).")
         log_line(f"[OK] sha256 verified for {dst.name}: {got_sha}")
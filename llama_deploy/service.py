@@ -20,13 +20,17 @@ Two compose layouts are generated depending on cfg.auth_mode:
 
 from __future__ import annotations
 
+import json
 import os
 import secrets as _secrets
+import subprocess
+import time
 from pathlib import Path
 from shlex import quote
+from typing import Optional
 
 from llama_deploy.config import AccessProfile, AuthMode, Config, DockerNetworkMode, ModelSpec
-from llama_deploy.log import sh
+from llama_deploy.log import log_line, sh
 from llama_deploy.system import write_file
 
 
@@ -40,12 +44,18 @@ def _load_or_create_webui_secret(base_dir: Path) -> str:
     Persisting avoids invalidating Open WebUI sessions on every redeploy.
     """
     key_path = base_dir / "secrets" / "webui_secret.key"
-    if key_path.exists():
+    try:
         return key_path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        pass
     key = _secrets.token_hex(32)
     key_path.parent.mkdir(parents=True, exist_ok=True)
-    key_path.write_text(key + "\n", encoding="utf-8")
-    os.chmod(key_path, 0o600)
+    # Created 0600 by open() itself, so the key is never readable by others.
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.write(fd, (key + "\n").encode("utf-8"))
+    finally:
+        os.close(fd)
     return key
 
 
@@ -107,40 +117,185 @@ _SIDECAR_SCRIPT = '''\
 llama_deploy auth sidecar.
 
 Called by NGINX via auth_request. Reads active SHA-256 token hashes from
-HASHES_FILE (reloaded on every request so revocation is instant without a
-container restart). Returns HTTP 200 when the bearer token matches a stored
-hash, 401 otherwise.
+HASHES_BIN (raw 32-byte digests, sorted and concatenated) or, if that file is
+absent, from the hex list in HASHES_FILE. Returns HTTP 200 when the bearer
+token matches a stored hash, 401 otherwise.
+
+The hashes are re-read only when inotify reports that one of the files was
+replaced, so revocation is still instant without a container restart. Where
+inotify is unavailable, or the watch is lost, they are reloaded on every
+request instead.
+
+HASHES_BIN is mmapped and bisected, so a lookup touches O(log N) records.
+When watching, each reload also builds a small Bloom filter over the
+digests; most unknown tokens are rejected by two bit tests before any
+bisect. The probe order depends only on the SHA-256 of the presented
+token, which reveals nothing about stored tokens; the final match uses
+hmac.compare_digest.
 
 Never logs the Authorization header to avoid capturing token values.
 """
+import ctypes
 import hashlib
+import hmac
 import http.server
 import json
+import mmap
 import os
+import struct
+import threading
 from pathlib import Path
 
 HASHES_FILE = Path(os.getenv("HASHES_FILE", "/run/secrets/token_hashes.json"))
+HASHES_BIN = Path(os.getenv("HASHES_BIN", "/run/secrets/token_hashes.sorted.bin"))
+DIGEST_SIZE = 32
+_SHA256_PROTO = hashlib.sha256()  # copied per request instead of re-initialised
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000  # events were dropped; wd is -1 and there is no name
+IN_IGNORED = 0x8000     # the watch is gone (directory removed or unmounted)
+_EVENT = struct.Struct("iIII")  # struct inotify_event, minus the trailing name
 
+BLOOM_BITS = 8192  # 1 KiB; ~0.06% false positives at 100 tokens
 
-def _load_hashes() -> set:
-    if not HASHES_FILE.exists():
-        return set()
+_state = None  # (buf, digests, bloom) kept current by the watcher; None = read per request
+
+
+def watch_hashfiles(paths, callback, on_stale) -> bool:
+    """
+    Call callback() from a background thread whenever one of paths is
+    written, renamed into place or deleted, or when the kernel reports
+    dropped events. The parent directories are watched, since atomic writes
+    swap in a new inode. on_stale() is called whenever whatever callback()
+    last loaded can no longer be trusted: callback() raised, or the watch
+    itself was lost (in which case the thread ends). Returns False, having
+    started nothing, if inotify is unavailable.
+    """
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return False
+    if fd < 0:
+        return False
+    names = {p.name.encode() for p in paths}
+    for parent in {str(p.parent) for p in paths}:
+        if libc.inotify_add_watch(fd, parent.encode(), IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE) < 0:
+            os.close(fd)
+            return False
+
+    def _loop() -> None:
+        try:
+            while True:
+                buf = os.read(fd, 4096)
+                off, hit, lost = 0, False, False
+                while off < len(buf):
+                    _, mask, _, length = _EVENT.unpack_from(buf, off)
+                    name = buf[off + _EVENT.size:off + _EVENT.size + length].rstrip(bytes(1))
+                    lost = lost or bool(mask & IN_IGNORED)
+                    hit = hit or bool(mask & IN_Q_OVERFLOW) or name in names
+                    off += _EVENT.size + length
+                if lost:
+                    break
+                if hit:
+                    try:
+                        callback()
+                    except Exception:
+                        on_stale()  # the next successful reload restores it
+        except Exception:
+            pass
+        on_stale()
+        os.close(fd)
+
+    threading.Thread(target=_loop, daemon=True).start()
+    return True
+
+
+def _read_hashes():
+    """
+    Return (buf, None) with buf the sorted digests of HASHES_BIN (an mmap, or
+    b"" for an empty set), or (None, digests) from HASHES_FILE when the .bin
+    is absent.
+    """
+    try:
+        with open(HASHES_BIN, "rb") as f:
+            if os.fstat(f.fileno()).st_size < DIGEST_SIZE:
+                return b"", None  # empty set; mmap refuses zero-length files
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), None
+    except FileNotFoundError:
+        pass
+    except Exception:
+        return b"", None
     try:
-        return set(json.loads(HASHES_FILE.read_text(encoding="utf-8")).get("hashes", []))
+        hexes = json.loads(HASHES_FILE.read_text(encoding="utf-8")).get("hashes", [])
+        return None, [bytes.fromhex(h) for h in hexes]
     except Exception:
-        return set()
+        return b"", None
+
+
+def _bloom_bits(digest: bytes):
+    # SHA-256 output is uniform, so two slices of it serve as independent hashes.
+    return (int.from_bytes(digest[:8], "little") % BLOOM_BITS,
+            int.from_bytes(digest[8:16], "little") % BLOOM_BITS)
+
+
+def _bloom(buf) -> bytes:
+    bits = bytearray(BLOOM_BITS // 8)
+    for off in range(0, len(buf) - DIGEST_SIZE + 1, DIGEST_SIZE):
+        for i in _bloom_bits(buf[off:off + DIGEST_SIZE]):
+            bits[i >> 3] |= 1 << (i & 7)
+    return bytes(bits)
+
+
+def _reload() -> None:
+    global _state
+    buf, digests = _read_hashes()
+    _state = (buf, digests, _bloom(buf) if buf is not None else None)
+
+
+def _drop_state() -> None:
+    global _state
+    _state = None  # back to reading the hash files on every request
+
+
+def _bisect(buf, presented: bytes) -> bool:
+    lo, hi = 0, len(buf) // DIGEST_SIZE
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if buf[mid * DIGEST_SIZE:(mid + 1) * DIGEST_SIZE] < presented:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == len(buf) // DIGEST_SIZE:
+        return False
+    return hmac.compare_digest(buf[lo * DIGEST_SIZE:(lo + 1) * DIGEST_SIZE], presented)
+
+
+def _is_authorized(token: str) -> bool:
+    h = _SHA256_PROTO.copy()
+    h.update(token.encode())
+    presented = h.digest()
+    state = _state  # one read: the watcher may swap or drop it concurrently
+    if state is not None:
+        buf, digests, bloom = state
+        if bloom is not None and not all(bloom[i >> 3] >> (i & 7) & 1 for i in _bloom_bits(presented)):
+            return False
+    else:
+        buf, digests = _read_hashes()
+    if buf is not None:
+        return _bisect(buf, presented)
+    return any(hmac.compare_digest(presented, d) for d in digests)
 
 
 class _AuthHandler(http.server.BaseHTTPRequestHandler):
     def do_GET(self) -> None:
         auth = self.headers.get("Authorization", "")
-        if auth.startswith("Bearer "):
-            token = auth[7:]
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
-            if token_hash in _load_hashes():
-                self.send_response(200)
-                self.end_headers()
-                return
+        if auth.startswith("Bearer ") and _is_authorized(auth[7:]):
+            self.send_response(200)
+            self.end_headers()
+            return
         self.send_response(401)
         self.end_headers()
 
@@ -149,6 +304,9 @@ class _AuthHandler(http.server.BaseHTTPRequestHandler):
 
 
 if __name__ == "__main__":
+    # Watch before the first read so no replacement can slip in between.
+    if watch_hashfiles([HASHES_BIN, HASHES_FILE], _reload, _drop_state):
+        _reload()
     port = int(os.getenv("AUTH_PORT", "9000"))
     server = http.server.HTTPServer(("0.0.0.0", port), _AuthHandler)
     server.serve_forever()
@@ -220,6 +378,25 @@ def _llama_bind_host(cfg: Config) -> str:
     return "0.0.0.0"
 
 
+def _healthcheck_block(cfg: Config) -> str:
+    """
+    Compose healthcheck for llama-router.
+
+    Declared explicitly (rather than relying on the image default) so Docker
+    emits health_status events that health.wait_health_via_docker_events()
+    can wait on. start_period covers slow first-time model loads.
+    """
+    bind_host = _llama_bind_host(cfg)
+    probe_host = "127.0.0.1" if bind_host == "0.0.0.0" else bind_host
+    return f"""    healthcheck:
+      test: ["CMD", "curl", "-fsS", "http://{probe_host}:8080/health"]
+      interval: 5s
+      timeout: 3s
+      retries: 3
+      start_period: 300s
+"""
+
+
 def _write_compose_plaintext(compose_path: Path, cfg: Config) -> None:
     """Plaintext mode: llama-server owns auth via --api-key-file."""
     net = cfg.network
@@ -265,7 +442,7 @@ def _write_compose_plaintext(compose_path: Path, cfg: Config) -> None:
     read_only: true
     tmpfs:
       - /tmp:rw,noexec,nosuid,size=256m
-"""
+{_healthcheck_block(cfg)}"""
     write_file(compose_path, content, mode=0o644)
 
 
@@ -359,7 +536,7 @@ def _write_compose_hashed(compose_path: Path, cfg: Config) -> None:
     read_only: true
     tmpfs:
       - /tmp:rw,noexec,nosuid,size=256m
-
+{_healthcheck_block(cfg)}
   llama-auth:
     image: python:3.12-slim
     container_name: llama-auth
@@ -374,6 +551,7 @@ def _write_compose_hashed(compose_path: Path, cfg: Config) -> None:
 
     environment:
       - HASHES_FILE=/run/secrets/token_hashes.json
+      - HASHES_BIN=/run/secrets/token_hashes.sorted.bin
       - AUTH_PORT=9000
 
     security_opt:
@@ -392,8 +570,73 @@ def _write_compose_hashed(compose_path: Path, cfg: Config) -> None:
 # Docker lifecycle
 # ---------------------------------------------------------------------------
 
-def docker_pull(image: str) -> None:
+# A local image whose digest was confirmed by a pull within this window is
+# reused as-is instead of asking the registry again.
+IMAGE_DIGEST_TTL_S = 86400
+
+_IMAGE_DIGESTS_FILE = "image_digests.json"
+
+
+def _local_image_digest(image: str) -> str:
+    """Return the image's first RepoDigest, or "" if it is not present locally."""
+    try:
+        return subprocess.run(
+            ["docker", "image", "inspect", "--format", "{{index .RepoDigests 0}}", image],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            check=False,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _read_image_digests(cache_dir: Path) -> dict:
+    try:
+        data = json.loads((cache_dir / _IMAGE_DIGESTS_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def image_digest_fresh(image: str, cache_dir: Path, ttl_s: int = IMAGE_DIGEST_TTL_S) -> bool:
+    """
+    True when the local copy of image matches the digest recorded by a
+    successful docker_pull() less than ttl_s seconds ago.
+    """
+    digest = _local_image_digest(image)
+    if not digest:
+        return False
+    entry = _read_image_digests(cache_dir).get(image)
+    if not isinstance(entry, dict) or entry.get("digest") != digest:
+        return False
+    try:
+        verified_at = float(entry.get("verified_at", 0))
+    except (TypeError, ValueError):
+        return False
+    if time.time() - verified_at >= ttl_s:
+        return False
+    log_line(f"[OK] {image} pulled {int(time.time() - verified_at)}s ago ({digest}); skipping pull")
+    return True
+
+
+def docker_pull(image: str, cache_dir: Optional[Path] = None) -> None:
+    """Pull image; with cache_dir, record its digest for image_digest_fresh()."""
     sh(f"docker pull {quote(image)}")
+    if cache_dir is None:
+        return
+    digest = _local_image_digest(image)
+    if not digest:
+        return
+    digests = _read_image_digests(cache_dir)
+    digests[image] = {"digest": digest, "verified_at": time.time()}
+    path = cache_dir / _IMAGE_DIGESTS_FILE
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    try:
+        tmp.write_text(json.dumps(digests, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        log_line(f"[WARN] Could not write {path.name}: {e}")
 
 
 def docker_compose_up(compose_path: Path) -> None:
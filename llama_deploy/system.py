@@ -15,7 +15,7 @@ import socket
 import subprocess
 from pathlib import Path
 from shlex import quote
-from typing import List, Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 from llama_deploy.log import die, log_line, sh
 
@@ -118,13 +118,59 @@ def detect_ssh_ports() -> List[int]:
 # Package installation
 # ---------------------------------------------------------------------------
 
-def ensure_base_packages() -> None:
+BASE_PACKAGES: Tuple[str, ...] = ("ca-certificates", "curl", "gnupg", "ufw", "jq", "python3")
+
+# Everything the host steps need from apt, installed in one transaction at
+# boot by run_deploy() so dpkg triggers and index reads happen once. tqdm is
+# deliberately not in it: the bundle is fatal on failure, while tqdm is
+# optional and _ensure_tqdm() installs it best-effort (apt, pip, then stub).
+BOOT_APT_PACKAGES: Tuple[str, ...] = BASE_PACKAGES + ("unattended-upgrades",)
+
+
+def _missing_packages(packages: Sequence[str]) -> List[str]:
+    """Return the subset of packages that dpkg does not report as installed."""
+    try:
+        out = subprocess.run(
+            ["dpkg-query", "-W", "-f=${Package}\t${db:Status-Abbrev}\n", *packages],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            check=False,
+        ).stdout
+    except OSError:
+        return list(packages)
+    installed = set()
+    for ln in out.splitlines():
+        name, _, status = ln.partition("\t")
+        if status.startswith("ii"):
+            installed.add(name)
+    return [p for p in packages if p not in installed]
+
+
+def ensure_apt_bundle(packages: Sequence[str]) -> None:
+    """
+    Install every missing package with a single apt-get transaction.
+
+    No-op (and no apt-get update) when all of them are already installed.
+    """
+    missing = _missing_packages(packages)
+    if not missing:
+        log_line(f"[OK] apt packages present: {' '.join(packages)}")
+        return
     sh("export DEBIAN_FRONTEND=noninteractive; apt-get update -y")
-    sh("export DEBIAN_FRONTEND=noninteractive; apt-get install -y ca-certificates curl gnupg ufw jq python3")
+    sh(
+        "export DEBIAN_FRONTEND=noninteractive; apt-get install -y "
+        + " ".join(quote(p) for p in missing)
+    )
+
+
+def ensure_base_packages() -> None:
+    # Normally satisfied by the boot bundle; installs only what is still missing.
+    ensure_apt_bundle(BASE_PACKAGES)
 
 
 def ensure_unattended_upgrades() -> None:
-    sh("export DEBIAN_FRONTEND=noninteractive; apt-get install -y unattended-upgrades")
+    ensure_apt_bundle(("unattended-upgrades",))
     sh("dpkg-reconfigure -f noninteractive unattended-upgrades", check=False)
 
 
@@ -4,20 +4,27 @@ API token persistence and lifecycle management.
 Storage layout under <base_dir>/secrets/:
 
   Plaintext mode (default):
-    tokens.json     — structured metadata; 'value' field holds plaintext token
+    tokens.jsonl    — metadata log; 'value' field holds plaintext token
     api_keys        — flat one-token-per-line file read by llama-server
 
   Hashed mode (--auth-mode hashed):
-    tokens.json     — structured metadata; 'value' is null, 'hash' holds SHA-256
-    token_hashes.json — flat list of active SHA-256 hashes read by the auth sidecar
+    tokens.jsonl    — metadata log; 'value' is null, 'hash' holds SHA-256
+    token_hashes.json — flat list of active SHA-256 hashes (hex)
+    token_hashes.sorted.bin — the same digests as sorted raw 32-byte values, bisected by the auth sidecar
     api_keys        — not created
 
+tokens.jsonl is append-only: one JSON object per line, either a full token
+record (on create) or a {"id", "revoke": true, "revoked_at"} tombstone (on
+revoke). Reading folds the lines into one record per id; compact() rewrites
+the file as plain records once tombstones pile up. A tokens.json from older
+releases is converted on first load.
+
 In hashed mode the plaintext token value is returned to the caller at creation
 time and never written to disk. Subsequent calls to show_token() will raise
 ValueError because the plaintext is unrecoverable.
 
 Token IDs use the prefix "tk_" + 12 hex chars.
-Token values use the prefix "sk-" + 48 url-safe chars.
+Token values use the prefix "sk-" + 64 url-safe chars (48 random bytes).
 
 This module imports only from log.py (and stdlib) to stay low in the
 dependency graph. The orchestrator and CLI both use TokenStore directly.
@@ -25,23 +32,98 @@ dependency graph. The orchestrator and CLI both use TokenStore directly.
 
 from __future__ import annotations
 
+import base64
 import datetime as dt
 import hashlib
 import json
 import os
 import secrets
-from dataclasses import asdict, dataclass
+import sys
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 
 from llama_deploy.config import AuthMode
 
+# orjson is an optional C accelerator (pip install llama-deploy[fast]); the
+# stdlib json module is used when it is not installed.
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+# ---------------------------------------------------------------------------
+# JSON codec
+# ---------------------------------------------------------------------------
+
+def _json_dumps(obj: object) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes; every file here is machine-read."""
+    if _orjson is not None:
+        return _orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data: Union[str, bytes]) -> object:
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+# ---------------------------------------------------------------------------
+# Durable writes
+# ---------------------------------------------------------------------------
+
+def _atomic_write(path: Path, data: Union[str, bytes], mode: int = 0o600) -> None:
+    """
+    Replace path with data in one step: write + fsync a sibling .tmp file
+    (created with mode, never world-readable in between), then os.replace().
+    Readers see either the old or the new file, never a torn one.
+    """
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        os.fchmod(fd, mode)  # O_CREAT mode is umask-filtered and ignored for a stale tmp
+        os.write(fd, data.encode("utf-8") if isinstance(data, str) else data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+
+def _fsync_dir(path: Path) -> None:
+    """fsync a directory so renames into it survive a crash."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Copying a primed context skips the per-call digest lookup and init.
+_SHA256_PROTO = hashlib.sha256()
+
+
+def _sha256(data: bytes) -> bytes:
+    h = _SHA256_PROTO.copy()
+    h.update(data)
+    return h.digest()
+
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO 8601 string, e.g. 2024-01-01T00:00:00.123456+00:00."""
+    return dt.datetime.now(dt.timezone.utc).isoformat()
+
 
 # ---------------------------------------------------------------------------
 # Data model
 # ---------------------------------------------------------------------------
 
-@dataclass
+# Slotted records drop the per-instance __dict__; dataclass(slots=True) needs 3.10+.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class TokenRecord:
     id: str            # "tk_<12 hex chars>"
     name: str          # human label, e.g. "my-app"
@@ -49,10 +131,11 @@ class TokenRecord:
     revoked: bool = False
     revoked_at: Optional[str] = None
     value: Optional[str] = None  # plaintext; set in plaintext mode, None in hashed mode
-    hash: Optional[str] = None   # SHA-256 hex; set in hashed mode, None in plaintext mode
+    hash: Optional[bytes] = None  # raw SHA-256 digest; set in hashed mode, None in plaintext mode
 
     @classmethod
     def _from_dict(cls, d: dict) -> "TokenRecord":
+        token_hash = d.get("hash")
         return cls(
             id=d["id"],
             name=d["name"],
@@ -60,24 +143,69 @@ class TokenRecord:
             revoked=d.get("revoked", False),
             revoked_at=d.get("revoked_at"),
             value=d.get("value"),
-            hash=d.get("hash"),
+            hash=bytes.fromhex(token_hash) if token_hash else None,
         )
 
     def _to_dict(self) -> dict:
-        return asdict(self)
+        # Flat record: a literal avoids asdict()'s recursive deepcopy. The
+        # digest is kept raw in memory and only hexed for the on-disk form.
+        return {
+            "id": self.id,
+            "name": self.name,
+            "created_at": self.created_at,
+            "revoked": self.revoked,
+            "revoked_at": self.revoked_at,
+            "value": self.value,
+            "hash": self.hash.hex() if self.hash is not None else None,
+        }
 
     @property
     def status(self) -> str:
         return "REVOKED" if self.revoked else "active"
 
 
+def _fold(data: bytes) -> Tuple[List[TokenRecord], int]:
+    """
+    Replay tokens.jsonl: record lines add tokens, tombstones revoke them.
+    Returns (records in creation order, number of log lines). A trailing line
+    without a newline is a torn append from a crash and is ignored; so is a
+    line that does not decode (a torn line that a later append terminated).
+    """
+    lines = data.split(b"\n")
+    lines.pop()  # b"" after the final newline, or the torn tail
+    by_id: Dict[str, TokenRecord] = {}
+    entries = 0
+    for line in lines:
+        if not line:
+            continue
+        entries += 1
+        try:
+            d = _json_loads(line)
+        except ValueError:
+            continue
+        if d.get("revoke"):
+            t = by_id.get(d["id"])
+            if t is not None:
+                t.revoked    = True
+                t.revoked_at = d.get("revoked_at")
+        else:
+            by_id[d["id"]] = TokenRecord._from_dict(d)
+    return list(by_id.values()), entries
+
+
 # ---------------------------------------------------------------------------
 # Store
 # ---------------------------------------------------------------------------
 
+_ID_BYTES = 6       # -> "tk_" + 12 hex chars
+_VALUE_BYTES = 48   # -> "sk-" + 64 url-safe chars, as secrets.token_urlsafe(48)
+
+# compact() rewrites tokens.jsonl once it holds more lines than this per token.
+_COMPACT_RATIO = 1.5
+
 class TokenStore:
     """
-    Manages the token metadata JSON file and the llama-server / sidecar keyfile.
+    Manages the token metadata log and the llama-server / sidecar keyfile.
 
     All mutating methods call the appropriate sync method so the keyfile stays
     consistent with the active token set.
@@ -86,9 +214,17 @@ class TokenStore:
     def __init__(self, secrets_dir: Path, auth_mode: AuthMode = AuthMode.PLAINTEXT) -> None:
         self._dir        = secrets_dir
         self._auth_mode  = auth_mode
-        self._json_path  = secrets_dir / "tokens.json"
+        self._log_path   = secrets_dir / "tokens.jsonl"
+        self._json_path  = secrets_dir / "tokens.json"        # legacy, migrated on load
         self._keyfile    = secrets_dir / "api_keys"           # plaintext mode
         self._hashfile   = secrets_dir / "token_hashes.json"  # hashed mode
+        self._hashbin    = secrets_dir / "token_hashes.sorted.bin"   # hashed mode, sidecar input
+        # Folded tokens.jsonl, reused while the file's (mtime_ns, size) stamp is
+        # unchanged; writes refresh it from the list they just persisted.
+        self._cache: Optional[List[TokenRecord]] = None
+        self._cache_stamp: Optional[Tuple[int, int]] = None
+        self._index: Dict[str, int] = {}  # token id -> position in _cache
+        self._entries = 0                 # lines in tokens.jsonl, for compact()
 
     @property
     def auth_mode(self) -> AuthMode:
@@ -104,22 +240,24 @@ class TokenStore:
 
     def active_tokens(self) -> List[TokenRecord]:
         """Return only non-revoked tokens."""
-        return [t for t in self._load() if not t.revoked]
+        return [t for t in self._cached() if not t.revoked]
 
     def show_token(self, token_id: str) -> TokenRecord:
         """
         Return a single token by id; raises KeyError if not found.
         Raises ValueError in hashed mode (plaintext was never stored).
         """
-        for t in self._load():
-            if t.id == token_id:
-                if self._auth_mode == AuthMode.HASHED and t.value is None:
-                    raise ValueError(
-                        f"Token '{token_id}' was created in hashed mode — "
-                        "the plaintext value was never stored on disk and cannot be recovered."
-                    )
-                return t
-        raise KeyError(f"Token not found: {token_id}")
+        tokens = self._cached()
+        idx = self._index.get(token_id)
+        if idx is None:
+            raise KeyError(f"Token not found: {token_id}")
+        t = tokens[idx]
+        if self._auth_mode == AuthMode.HASHED and t.value is None:
+            raise ValueError(
+                f"Token '{token_id}' was created in hashed mode — "
+                "the plaintext value was never stored on disk and cannot be recovered."
+            )
+        return t
 
     # -----------------------------------------------------------------------
     # Write
@@ -129,79 +267,242 @@ class TokenStore:
         """
         Generate a new token, persist it, and resync the keyfile.
 
-        In plaintext mode: stores the raw value in tokens.json and api_keys.
+        In plaintext mode: stores the raw value in tokens.jsonl and api_keys.
         In hashed mode: stores only the SHA-256 hash; the caller receives the
-        record with value set (show it once) but tokens.json holds value=None.
+        record with value set (show it once) but tokens.jsonl holds value=None.
         If value is provided, it is used as the token plaintext instead of
         generating a random token.
         """
-        token_id  = "tk_" + secrets.token_hex(6)         # 12 hex chars
-        raw_value = value or ("sk-" + secrets.token_urlsafe(48))
-        if not raw_value.strip():
-            raise ValueError("Token value must not be empty.")
-        now       = dt.datetime.now(dt.timezone.utc).isoformat()
+        return self.create_tokens([(name, value)])[0]
 
-        if self._auth_mode == AuthMode.HASHED:
-            token_hash = hashlib.sha256(raw_value.encode()).hexdigest()
-            # Store hash only — value is NOT persisted
-            stored_record = TokenRecord(
-                id=token_id, name=name, created_at=now,
-                value=None, hash=token_hash,
-            )
-            # Return record with value populated so the caller can show it once
-            display_record = TokenRecord(
-                id=token_id, name=name, created_at=now,
-                value=raw_value, hash=token_hash,
-            )
-        else:
-            stored_record = TokenRecord(
-                id=token_id, name=name, created_at=now, value=raw_value,
-            )
-            display_record = stored_record
-
-        tokens = self._load()
-        tokens.append(stored_record)
-        self._save(tokens)
-        self._sync(tokens)
-        return display_record
+    def create_tokens(self, specs: List[Tuple[str, Optional[str]]]) -> List[TokenRecord]:
+        """
+        Batch form of create_token(): one (name, value) pair per token, with
+        one append to tokens.jsonl and one keyfile rewrite for the batch.
+        Nothing is written if any value is invalid.
+        """
+        stored: List[TokenRecord] = []
+        display: List[TokenRecord] = []
+        now = _now_iso()  # one timestamp for the whole batch
+        # One getrandom() for the batch, sliced into id and value bytes per token.
+        step = _ID_BYTES + _VALUE_BYTES
+        pool = secrets.token_bytes(step * len(specs))
+        for i, (name, value) in enumerate(specs):
+            rand      = pool[i * step:(i + 1) * step]
+            token_id  = "tk_" + rand[:_ID_BYTES].hex()
+            raw_value = value or ("sk-" + base64.urlsafe_b64encode(rand[_ID_BYTES:]).rstrip(b"=").decode("ascii"))
+            if not raw_value.strip():
+                raise ValueError("Token value must not be empty.")
+
+            if self._auth_mode == AuthMode.HASHED:
+                token_hash = _sha256(raw_value.encode())
+                # Store hash only — value is NOT persisted
+                stored_record = TokenRecord(
+                    id=token_id, name=name, created_at=now,
+                    value=None, hash=token_hash,
+                )
+                # Return record with value populated so the caller can show it once
+                display_record = TokenRecord(
+                    id=token_id, name=name, created_at=now,
+                    value=raw_value, hash=token_hash,
+                )
+            else:
+                stored_record = TokenRecord(
+                    id=token_id, name=name, created_at=now, value=raw_value,
+                )
+                display_record = stored_record
+            stored.append(stored_record)
+            display.append(display_record)
+
+        if stored:
+            tokens = self._load()
+            tokens.extend(stored)
+            self._commit(tokens, [r._to_dict() for r in stored], added=stored)
+        return display
 
     def revoke_token(self, token_id: str) -> TokenRecord:
         """
         Mark a token as revoked and resync the keyfile.
         Returns the updated record; raises KeyError if not found.
         """
+        return self.revoke_tokens([token_id])[0]
+
+    def revoke_tokens(self, token_ids: List[str]) -> List[TokenRecord]:
+        """
+        Batch form of revoke_token() with a single tombstone append and one
+        keyfile rewrite. All ids are checked first (KeyError if unknown,
+        ValueError if already revoked), so a bad id revokes nothing.
+        """
         tokens = self._load()
-        for t in tokens:
-            if t.id == token_id:
-                if t.revoked:
-                    raise ValueError(f"Token {token_id} is already revoked.")
-                t.revoked    = True
-                t.revoked_at = dt.datetime.now(dt.timezone.utc).isoformat()
-                self._save(tokens)
-                self._sync(tokens)
-                return t
-        raise KeyError(f"Token not found: {token_id}")
+        positions: List[int] = []
+        for token_id in token_ids:
+            idx = self._index.get(token_id)
+            if idx is None:
+                raise KeyError(f"Token not found: {token_id}")
+            if tokens[idx].revoked or idx in positions:
+                raise ValueError(f"Token {token_id} is already revoked.")
+            positions.append(idx)
+
+        if not positions:
+            return []
+        # Revoked copies go into this fresh list only; the cached records are
+        # left untouched unless _commit() gets the tombstones onto disk.
+        now = _now_iso()
+        for idx in positions:
+            tokens[idx] = replace(tokens[idx], revoked=True, revoked_at=now)
+        targets = [tokens[idx] for idx in positions]
+        self._commit(tokens, [{"id": t.id, "revoke": True, "revoked_at": now} for t in targets])
+        self.compact()
+        return targets
+
+    def compact(self) -> bool:
+        """
+        Rewrite tokens.jsonl as one line per token once it holds more than
+        _COMPACT_RATIO lines per token (i.e. tombstones have piled up).
+        Returns True if the log was rewritten.
+        """
+        tokens = self._load()
+        if self._entries <= _COMPACT_RATIO * len(tokens):
+            return False
+        self._rewrite(tokens)
+        _fsync_dir(self._dir)
+        return True
 
     # -----------------------------------------------------------------------
     # Internal
     # -----------------------------------------------------------------------
 
     def _load(self) -> List[TokenRecord]:
-        if not self._json_path.exists():
-            return []
-        raw = json.loads(self._json_path.read_text(encoding="utf-8"))
-        return [TokenRecord._from_dict(d) for d in raw.get("tokens", [])]
+        """
+        Return the records folded from tokens.jsonl as a fresh list the
+        caller may extend (records themselves are shared with the cache).
+        """
+        return list(self._cached())
+
+    def _cached(self) -> List[TokenRecord]:
+        """
+        Return the cache list itself, for read-only scans that would only
+        copy and discard it. The log is only re-read when its stamp changes,
+        so appends by other processes are still picked up.
+        """
+        try:
+            st = self._log_path.stat()
+        except FileNotFoundError:
+            if not self._migrate_legacy():
+                self._set_cache([], None, 0)
+            return self._cache or []
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._cache is None or stamp != self._cache_stamp:
+            tokens, entries = _fold(self._log_path.read_bytes())
+            self._set_cache(tokens, stamp, entries)
+        return self._cache
+
+    def _set_cache(
+        self,
+        tokens: List[TokenRecord],
+        stamp: Optional[Tuple[int, int]],
+        entries: int,
+    ) -> None:
+        self._cache = list(tokens)
+        self._cache_stamp = stamp
+        self._entries = entries
+        self._index = {t.id: i for i, t in enumerate(self._cache)}
+
+    def _migrate_legacy(self) -> bool:
+        """
+        Convert a tokens.json written by older releases into tokens.jsonl.
+        Returns False if there is none.
+        """
+        try:
+            data = self._json_path.read_bytes()
+        except FileNotFoundError:
+            return False
+        raw = _json_loads(data)
+        self._rewrite([TokenRecord._from_dict(d) for d in raw.get("tokens", [])])
+        self._json_path.unlink()
+        _fsync_dir(self._dir)
+        return True
+
+    def _commit(
+        self,
+        tokens: List[TokenRecord],
+        entries: List[dict],
+        added: Optional[List[TokenRecord]] = None,
+    ) -> None:
+        """
+        Append entries to the log, update the keyfile, then make both durable.
+        When the mutation only adds tokens (added), plaintext values are
+        appended to api_keys instead of rewriting it; revocations and the
+        sorted hash files always rewrite.
+        """
+        self._append(tokens, entries)
+        if added is None or not self._append_keys(added):
+            self._sync(tokens)
+        _fsync_dir(self._dir)
+
+    def _append(self, tokens: List[TokenRecord], entries: List[dict]) -> None:
+        """
+        Append entries (one JSON line each) with a single O_APPEND write.
+        tokens is the resulting folded list; it becomes the cache unless the
+        file grew by more than what was written (a concurrent writer), in
+        which case the next _load() re-reads the log.
 
-    def _save(self, tokens: List[TokenRecord]) -> None:
+        If the log ends in a torn line (a crash mid-append), a newline is
+        written first so the new entries do not run on from it.
+        """
         self._dir.mkdir(parents=True, exist_ok=True)
-        data = json.dumps({"tokens": [t._to_dict() for t in tokens]}, indent=2)
-        self._json_path.write_text(data + "\n", encoding="utf-8")
-        os.chmod(self._json_path, 0o600)
+        data = b"".join(_json_dumps(e) + b"\n" for e in entries)
+        base = self._cache_stamp[1] if self._cache_stamp else 0
+        fd = os.open(self._log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.fchmod(fd, 0o600)
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b"\n":
+                data = b"\n" + data
+            os.write(fd, data)
+            os.fsync(fd)
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+        if st.st_size == base + len(data):
+            self._set_cache(tokens, (st.st_mtime_ns, st.st_size), self._entries + len(entries))
+        else:
+            self._cache = None
 
-    def _sync(self, tokens: Optional[List[TokenRecord]] = None) -> None:
-        """Dispatch to the correct keyfile writer based on auth mode."""
-        if tokens is None:
-            tokens = self._load()
+    def _rewrite(self, tokens: List[TokenRecord]) -> None:
+        """Atomically replace the log with one record line per token."""
+        self._dir.mkdir(parents=True, exist_ok=True)
+        data = b"".join(_json_dumps(t._to_dict()) + b"\n" for t in tokens)
+        _atomic_write(self._log_path, data)
+        st = self._log_path.stat()
+        self._set_cache(tokens, (st.st_mtime_ns, st.st_size), len(tokens))
+
+    def _append_keys(self, added: List[TokenRecord]) -> bool:
+        """
+        Append the values of newly created tokens to api_keys (plaintext mode).
+        Returns False, having written nothing, when there is nothing that can
+        be extended: hashed mode (token_hashes.sorted.bin must stay sorted),
+        a missing api_keys, or one holding just the "\n" of an empty set. The
+        caller then does a full _sync(tokens).
+        """
+        if self._auth_mode == AuthMode.HASHED:
+            return False
+        data = "".join(t.value + "\n" for t in added if t.value).encode("utf-8")
+        try:
+            fd = os.open(self._keyfile, os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            return False
+        try:
+            if os.fstat(fd).st_size <= 1:
+                return False
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return True
+
+    def _sync(self, tokens: List[TokenRecord]) -> None:
+        """Rewrite the keyfile(s) for auth mode from tokens, the full folded list."""
         if self._auth_mode == AuthMode.HASHED:
             self._sync_hashfile(tokens)
         else:
@@ -212,20 +513,24 @@ class TokenStore:
         Rewrite api_keys with one plaintext value per line (active tokens only).
         llama-server reads this file; revoked tokens are simply absent.
         """
-        active = [t.value for t in tokens if not t.revoked and t.value]
-        self._keyfile.write_text("\n".join(active) + "\n", encoding="utf-8")
-        os.chmod(self._keyfile, 0o600)
+        # An empty set is written as a lone "\n". Joining over a trailing ""
+        # yields the final newline without copying the whole string again.
+        active = [t.value for t in tokens if not t.revoked and t.value] or [""]
+        active.append("")
+        _atomic_write(self._keyfile, "\n".join(active))
 
     def _sync_hashfile(self, tokens: List[TokenRecord]) -> None:
         """
-        Rewrite token_hashes.json with active SHA-256 hashes.
-        The auth sidecar reads this file; revoked tokens are simply absent.
-        Reload on every request in the sidecar means revocation is instant.
+        Rewrite token_hashes.json (hex) and token_hashes.sorted.bin (raw
+        digests in ascending order) with the active SHA-256 hashes. The auth
+        sidecar re-maps the .bin file when inotify reports the replace (or
+        re-reads it per request where inotify is unavailable) and bisects it,
+        so revocation is instant; revoked tokens are simply absent.
         """
-        active_hashes = [t.hash for t in tokens if not t.revoked and t.hash]
-        data = json.dumps({"hashes": active_hashes}, indent=2)
-        self._hashfile.write_text(data + "\n", encoding="utf-8")
-        os.chmod(self._hashfile, 0o600)
+        active = [t.hash for t in tokens if not t.revoked and t.hash]
+        hexes = [h.hex() for h in active]
+        _atomic_write(self._hashfile, _json_dumps({"hashes": hexes}) + b"\n")
+        _atomic_write(self._hashbin, b"".join(sorted(active)))
 
     def restart_hint(self) -> str:
         """Returns a one-liner the user can run to pick up keyfile changes."""
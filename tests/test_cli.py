@@ -51,6 +51,28 @@ class CliTests(unittest.TestCase):
         self.assertEqual(proc.returncode, 0, msg=proc.stderr)
         self.assertIn("Manage API tokens", proc.stdout)
 
+    def test_detect_auth_mode_from_hashed_token_log(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            from llama_deploy.tokens import TokenStore
+            TokenStore(base / "secrets", auth_mode=AuthMode.HASHED).create_token("app")
+            # A stale api_keys file must not win over the hashed records.
+            (base / "secrets" / "api_keys").write_text("sk-stale\n", encoding="utf-8")
+            self.assertEqual(_detect_auth_mode(base), AuthMode.HASHED)
+
+    def test_detect_auth_mode_leaves_legacy_tokens_json_in_place(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            base = Path(td)
+            (base / "secrets").mkdir()
+            legacy = base / "secrets" / "tokens.json"
+            legacy.write_text(
+                '{"tokens": [{"id": "tk_1", "name": "app", "created_at": "c", "hash": "ab"}]}',
+                encoding="utf-8",
+            )
+            self.assertEqual(_detect_auth_mode(base), AuthMode.HASHED)
+            self.assertTrue(legacy.exists())
+            self.assertFalse((base / "secrets" / "tokens.jsonl").exists())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,33 +1,284 @@
+import http.server
+import subprocess
+import sys
+import threading
+import time
+import types
 import unittest
 from unittest import mock
 
-from llama_deploy.health import wait_health
+from llama_deploy.config import AccessProfile, ModelSpec, NetworkConfig
+from llama_deploy.health import (
+    _run_concurrent,
+    curl_smoke_tests,
+    internal_smoke_test,
+    sanity_checks,
+    wait_health,
+    wait_health_via_docker_events,
+)
 
 
 class _Resp:
     def __init__(self, status: int) -> None:
         self.status = status
 
-    def __enter__(self):
-        return self
+    def read(self) -> bytes:
+        return b""
 
-    def __exit__(self, exc_type, exc, tb):
-        return False
+
+class _Conn:
+    """Stand-in for http.client.HTTPConnection that replays canned statuses."""
+
+    instances: list = []
+
+    def __init__(self, host, port=None, timeout=None) -> None:
+        self.host = host
+        self.port = port
+        self.statuses = list(_Conn.script)
+        self.requests: list = []
+        _Conn.instances.append(self)
+
+    def request(self, method, path, headers=None) -> None:
+        self.requests.append((method, path, dict(headers or {})))
+
+    def getresponse(self) -> _Resp:
+        nxt = self.statuses.pop(0)
+        if isinstance(nxt, BaseException):
+            raise nxt
+        return _Resp(nxt)
+
+    def close(self) -> None:
+        pass
 
 
 class HealthTests(unittest.TestCase):
+    def setUp(self) -> None:
+        _Conn.instances = []
+
     def test_wait_health_adds_bearer_header_when_provided(self) -> None:
-        seen_auth = {"value": None}
+        _Conn.script = [200]
+        with mock.patch("http.client.HTTPConnection", _Conn), \
+             mock.patch("llama_deploy.health.log_line"):
+            wait_health("http://127.0.0.1:8080/health", timeout_s=1, bearer_token="tok")
 
-        def _fake_urlopen(req, timeout=3):
-            seen_auth["value"] = req.get_header("Authorization")
-            return _Resp(200)
+        conn = _Conn.instances[0]
+        self.assertEqual((conn.host, conn.port), ("127.0.0.1", 8080))
+        self.assertEqual(conn.requests[0][1], "/health")
+        self.assertEqual(conn.requests[0][2].get("Authorization"), "Bearer tok")
 
-        with mock.patch("urllib.request.urlopen", side_effect=_fake_urlopen), \
+    def test_wait_health_reuses_one_connection_and_backs_off(self) -> None:
+        _Conn.script = [ConnectionRefusedError(), 503, 503, 200]
+        sleeps: list = []
+        with mock.patch("http.client.HTTPConnection", _Conn), \
+             mock.patch("llama_deploy.health.time.sleep", side_effect=sleeps.append), \
              mock.patch("llama_deploy.health.log_line"):
-            wait_health("http://127.0.0.1:8080/health", timeout_s=1, bearer_token="tok")
+            wait_health("http://127.0.0.1:8080/health", timeout_s=30)
+
+        self.assertEqual(len(_Conn.instances), 1)
+        self.assertEqual(len(_Conn.instances[0].requests), 4)
+        self.assertAlmostEqual(sleeps[0], 0.1, places=3)
+        self.assertGreater(sleeps[2], sleeps[1])
+
+
+class _EventsProc:
+    def __init__(self, lines) -> None:
+        self.stdout = iter(lines)
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self) -> None:
+        self.returncode = -9
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+
+class DockerEventsHealthTests(unittest.TestCase):
+    def _inspect(self, status: str):
+        return mock.Mock(stdout=status + "\n")
+
+    def test_returns_when_health_event_arrives(self) -> None:
+        lines = [
+            '{"status": "health_status: starting"}\n',
+            '{"status": "health_status: healthy"}\n',
+        ]
+        with mock.patch("subprocess.Popen", return_value=_EventsProc(lines)), \
+             mock.patch("subprocess.run", return_value=self._inspect("starting")), \
+             mock.patch("llama_deploy.health.log_line"):
+            self.assertTrue(wait_health_via_docker_events("llama-router", timeout_s=5))
+
+    def test_falls_back_without_container_healthcheck(self) -> None:
+        with mock.patch("subprocess.Popen", return_value=_EventsProc([])), \
+             mock.patch("subprocess.run", return_value=self._inspect("")), \
+             mock.patch("llama_deploy.health.log_line"):
+            self.assertFalse(wait_health_via_docker_events("llama-router", timeout_s=5))
+
+    def test_events_replayed_from_before_inspect(self) -> None:
+        with mock.patch("time.time", return_value=1700000000.7), \
+             mock.patch("subprocess.Popen", return_value=_EventsProc(['{"Action": "health_status: healthy"}\n'])) as popen, \
+             mock.patch("subprocess.run", return_value=self._inspect("starting")), \
+             mock.patch("llama_deploy.health.log_line"):
+            self.assertTrue(wait_health_via_docker_events("llama-router", timeout_s=5))
+
+        argv = popen.call_args.args[0]
+        self.assertEqual(argv[argv.index("--since") + 1], "1700000000")
+
+    def test_already_healthy_skips_event_stream(self) -> None:
+        with mock.patch("subprocess.Popen") as popen, \
+             mock.patch("subprocess.run", return_value=self._inspect("healthy")), \
+             mock.patch("llama_deploy.health.log_line"):
+            self.assertTrue(wait_health_via_docker_events("llama-router", timeout_s=5))
+        popen.assert_not_called()
+
+
+class SanityCheckTests(unittest.TestCase):
+    def test_run_concurrent_tags_and_limits_output(self) -> None:
+        py = sys.executable
+        with mock.patch("llama_deploy.health.log_line") as log:
+            out = _run_concurrent([
+                ("a", [py, "-c", "print('one'); print('two'); print('three')"], 2),
+                ("b", [py, "-c", "import sys; sys.stdout.write('tail-no-newline')"], None),
+                ("missing", ["/nonexistent/llama-deploy-cmd"], None),
+            ])
+
+        self.assertEqual(out, {"a": ["one", "two", "three"], "b": ["tail-no-newline"], "missing": []})
+        logged = [c.args[0] for c in log.call_args_list]
+        self.assertIn("[a] two", logged)
+        self.assertNotIn("[a] three", logged)
+        self.assertIn("[b] tail-no-newline", logged)
+
+    def _check(self, ss_lines) -> list:
+        net = NetworkConfig(bind_host="127.0.0.1", port=8080, publish=True,
+                            access_profile=AccessProfile.LOCALHOST)
+        out = {"docker-ps": [], "docker-logs": [], "ss": ss_lines}
+        with mock.patch("llama_deploy.health._run_concurrent", return_value=out), \
+             mock.patch("llama_deploy.health.log_line") as log:
+            sanity_checks(types.SimpleNamespace(network=net))
+        return [c.args[0] for c in log.call_args_list]
+
+    def test_wildcard_bind_is_flagged(self) -> None:
+        logged = self._check(["LISTEN 0 4096 0.0.0.0:8080 0.0.0.0:* users:((\"docker-proxy\"))"])
+        self.assertTrue(any(l.startswith("[WARN] sanity: port 8080") for l in logged))
+
+    def test_port_prefix_is_not_a_match(self) -> None:
+        logged = self._check(["LISTEN 0 4096 0.0.0.0:80800 0.0.0.0:*",
+                              "LISTEN 0 4096 127.0.0.1:8080 0.0.0.0:*"])
+        self.assertTrue(any(l.startswith("[OK] sanity: port 8080") for l in logged))
+
+
+class _ApiHandler(http.server.BaseHTTPRequestHandler):
+    seen: list = []
+
+    def _reply(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        _ApiHandler.seen.append((self.command, self.path, self.headers.get("Authorization")))
+        code = 500 if self.path == "/v1/embeddings" and _ApiHandler.fail_embeddings else 200
+        body = b'{"ok": true}' + b" " * 2000
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, fmt, *args) -> None:
+        pass
+
+
+class SmokeTestTests(unittest.TestCase):
+    def setUp(self) -> None:
+        _ApiHandler.seen = []
+        _ApiHandler.fail_embeddings = False
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _ApiHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.llm = ModelSpec(hf_repo="Qwen/Qwen3-8B-GGUF", candidate_patterns=["Q4_K_M"], ctx_len=2048)
+        self.emb = ModelSpec(hf_repo="Qwen/Qwen3-Embedding-0.6B-GGUF", candidate_patterns=["Q8_0"],
+                             ctx_len=2048, is_embedding=True)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_smoke_tests_hit_all_routes_in_process(self) -> None:
+        with mock.patch("llama_deploy.health.log_line"), \
+             mock.patch("llama_deploy.health.sh") as sh:
+            curl_smoke_tests(self.base_url, "tok", self.llm, self.emb)
+
+        sh.assert_not_called()
+        self.assertEqual(
+            sorted(_ApiHandler.seen),
+            [
+                ("GET", "/v1/models", "Bearer tok"),
+                ("POST", "/v1/chat/completions", "Bearer tok"),
+                ("POST", "/v1/embeddings", "Bearer tok"),
+            ],
+        )
+
+    def test_smoke_test_failure_warns_without_dying(self) -> None:
+        _ApiHandler.fail_embeddings = True
+        with mock.patch("llama_deploy.health.log_line") as log, \
+             mock.patch("llama_deploy.health.die") as die:
+            curl_smoke_tests(self.base_url, "tok", self.llm, self.emb)
+
+        die.assert_not_called()
+        warned = [c.args[0] for c in log.call_args_list if c.args[0].startswith("[WARN] Smoke tests failed")]
+        self.assertEqual(len(warned), 1)
+        self.assertIn("/v1/embeddings", warned[0])
+
+    def test_single_model_slot_sends_requests_one_at_a_time(self) -> None:
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def _request(base_url, token, method, path, payload):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return 200, b"{}", None
+
+        with mock.patch("llama_deploy.health._smoke_request", side_effect=_request) as req, \
+             mock.patch("llama_deploy.health.log_line"):
+            curl_smoke_tests(self.base_url, "tok", self.llm, self.emb, models_max=1)
+
+        self.assertEqual(req.call_count, 3)
+        self.assertEqual(peak[0], 1)
+
+
+class InternalSmokeTestTests(unittest.TestCase):
+    def test_output_truncated_in_process_and_token_redacted(self) -> None:
+        done = mock.Mock(returncode=0, stdout=b"x" * 5000)
+        with mock.patch("llama_deploy.health.subprocess.run", return_value=done) as run, \
+             mock.patch("llama_deploy.health.log_line") as log:
+            internal_smoke_test("bridge", "172.17.0.2", "sk-secret")
+
+        argv = run.call_args[0][0]
+        self.assertEqual(argv[:5], ["docker", "run", "--rm", "--network", "bridge"])
+        self.assertNotIn("head", argv[-1])
+        logged = [c.args[0] for c in log.call_args_list]
+        self.assertNotIn("sk-secret", "".join(logged))
+        self.assertEqual(logged[-1], "x" * 800)
+
+    def test_pull_progress_on_stderr_does_not_hide_curl_output(self) -> None:
+        pull = b"Unable to find image 'curlimages/curl:8.5.0' locally\n" + b"Pulling fs layer\n" * 200
+        failed = mock.Mock(returncode=22, stdout=b'{"status":"ok"}',
+                           stderr=pull + b"curl: (22) The requested URL returned error: 401\n")
+        with mock.patch("llama_deploy.health.subprocess.run", return_value=failed) as run, \
+             mock.patch("llama_deploy.health.log_line") as log, \
+             mock.patch("llama_deploy.health.die", side_effect=SystemExit(1)):
+            with self.assertRaises(SystemExit):
+                internal_smoke_test("bridge", "172.17.0.2", "sk-secret")
 
-        self.assertEqual(seen_auth["value"], "Bearer tok")
+        self.assertEqual(run.call_args[1]["stderr"], subprocess.PIPE)
+        logged = [c.args[0] for c in log.call_args_list]
+        self.assertIn('{"status":"ok"}', logged)
+        self.assertTrue(logged[-1].endswith("returned error: 401\n"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from llama_deploy import log
+
+
+class RedactTests(unittest.TestCase):
+    def test_redact_masks_every_secret_shape_in_one_line(self) -> None:
+        line = (
+            "curl -H 'authorization: bearer sk-1' -H \"X-API-KEY: k2\" "
+            "HF_TOKEN=hf_3 --hf-token hf_4 hf_token=keep"
+        )
+        self.assertEqual(
+            log.redact(line),
+            "curl -H 'authorization: bearer <REDACTED>' -H \"X-API-KEY: <REDACTED>\" "
+            "HF_TOKEN=<REDACTED> --hf-token <REDACTED> hf_token=keep",
+        )
+
+
+class ShTests(unittest.TestCase):
+    def setUp(self) -> None:
+        td = tempfile.TemporaryDirectory()
+        self.addCleanup(td.cleanup)
+        self.path = Path(td.name) / "deploy.log"
+        patcher = mock.patch.object(log, "LOG_PATH", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(log._close_log_fh)
+
+    def test_sh_streams_and_logs_every_line_redacted(self) -> None:
+        shown: list = []
+        with mock.patch.object(log.TQDM, "write", side_effect=shown.append):
+            rc = log.sh(
+                "printf 'one\\ntwo\\r\\n'; echo 'Authorization: Bearer sk-abc'; printf tail",
+                check=False,
+            )
+
+        self.assertEqual(rc, 0)
+        logged = self.path.read_text(encoding="utf-8").splitlines()
+        self.assertIn("$ printf", logged[1])
+        self.assertEqual(
+            logged[-4:],
+            ["one", "two", "Authorization: Bearer <REDACTED>", "tail"],
+        )
+        # Display is batched, but every line still reaches the terminal.
+        self.assertTrue("\n".join(shown).endswith("one\ntwo\nAuthorization: Bearer sk-abc\ntail"))
+
+    def test_sh_returns_exit_code_without_check(self) -> None:
+        self.assertEqual(log.sh("exit 3", check=False), 3)
+
+    def test_ctrl_c_escalates_to_sigkill_when_term_is_ignored(self) -> None:
+        procs: list = []
+        real_popen = log.subprocess.Popen
+
+        def _popen(*args, **kwargs):
+            procs.append(real_popen(*args, **kwargs))
+            return procs[-1]
+
+        ready = self.path.with_name("trap-installed")
+
+        class _InterruptingSelector:
+            def register(self, *_args) -> None:
+                pass
+
+            def select(self, timeout=None):
+                deadline = time.monotonic() + 10
+                while not ready.exists() and time.monotonic() < deadline:
+                    time.sleep(0.05)  # let the child install its TERM trap
+                raise KeyboardInterrupt
+
+            def close(self) -> None:
+                pass
+
+        with mock.patch.object(log.subprocess, "Popen", side_effect=_popen), \
+             mock.patch.object(log.selectors, "DefaultSelector", _InterruptingSelector), \
+             mock.patch.object(log, "_TERM_GRACE_S", 0.2), \
+             mock.patch.object(log.TQDM, "write"):
+            with self.assertRaises(KeyboardInterrupt):
+                log.sh(f"trap '' TERM; touch {ready}; sleep 30", check=False)
+
+        self.assertEqual(procs[0].returncode, -9)
+
+    def test_cancelled_worker_terminates_its_command(self) -> None:
+        procs: list = []
+        real_popen = log.subprocess.Popen
+
+        def _popen(*args, **kwargs):
+            procs.append(real_popen(*args, **kwargs))
+            return procs[-1]
+
+        ready = self.path.with_name("started")
+        cancel = threading.Event()
+        raised: list = []
+
+        def _worker() -> None:
+            log.set_cancel_event(cancel)
+            try:
+                log.sh(f"touch {ready}; sleep 30", check=False)
+            except log.Cancelled:
+                raised.append("cancelled")
+
+        with mock.patch.object(log.subprocess, "Popen", side_effect=_popen), \
+             mock.patch.object(log.TQDM, "write"):
+            t = threading.Thread(target=_worker)
+            t.start()
+            deadline = time.monotonic() + 10
+            while not ready.exists() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            cancel.set()
+            t.join(10)
+
+        self.assertEqual(raised, ["cancelled"])
+        self.assertEqual(procs[0].returncode, -15)  # SIGTERM'd, not orphaned
+
+
+class LogLineTests(unittest.TestCase):
+    def test_log_line_reuses_one_handle_and_flushes_lines(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "sub" / "deploy.log"
+            with mock.patch.object(log, "LOG_PATH", path):
+                log.log_line("first")
+                fh = log._get_log_fh()
+                log.log_line("second")
+                self.assertIs(log._get_log_fh(), fh)
+                self.assertEqual(path.read_text(encoding="utf-8"), "first\nsecond\n")
+            log._close_log_fh()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from llama_deploy import model
+
+
+class Sha256CacheTests(unittest.TestCase):
+    def test_sidecar_reused_until_file_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            gguf = Path(td) / "m.gguf"
+            gguf.write_bytes(b"weights")
+            expected = hashlib.sha256(b"weights").hexdigest()
+
+            self.assertEqual(model.sha256_file_cached(gguf), expected)
+            sidecar = Path(td) / "m.gguf.sha256"
+            self.assertEqual(sidecar.read_text(encoding="utf-8"), f"{expected}  m.gguf\n")
+
+            with mock.patch.object(model, "sha256_file") as full_hash:
+                self.assertEqual(model.sha256_file_cached(gguf), expected)
+            full_hash.assert_not_called()
+
+            # A newer file invalidates the sidecar.
+            gguf.write_bytes(b"other")
+            st = sidecar.stat()
+            os.utime(gguf, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+            self.assertEqual(model.sha256_file_cached(gguf), hashlib.sha256(b"other").hexdigest())
+
+    def test_malformed_sidecar_is_ignored(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            gguf = Path(td) / "m.gguf"
+            gguf.write_bytes(b"weights")
+            (Path(td) / "m.gguf.sha256").write_text("not-a-digest\n", encoding="utf-8")
+            self.assertEqual(model.sha256_file_cached(gguf), hashlib.sha256(b"weights").hexdigest())
+
+
+class DownloadExistingFileTests(unittest.TestCase):
+    def test_existing_file_is_verified_by_content_not_sidecar(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            gguf = Path(td) / "m.gguf"
+            gguf.write_bytes(b"tampered")
+            expected = hashlib.sha256(b"weights").hexdigest()
+            # A fresh sidecar still vouching for the original bytes.
+            (Path(td) / "m.gguf.sha256").write_text(f"{expected}  m.gguf\n", encoding="utf-8")
+
+            with mock.patch("urllib.request.urlopen", side_effect=OSError("offline")), \
+                 mock.patch.object(model, "log_line"), \
+                 mock.patch("llama_deploy.log.log_line"):
+                with self.assertRaises(SystemExit):
+                    model.download_hf_file("org/repo", "main", "m.gguf", gguf,
+                                           expected, None, None)
+            self.assertFalse(gguf.exists())
+            self.assertEqual(len(list(Path(td).glob("m.gguf.BADMETA.*"))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
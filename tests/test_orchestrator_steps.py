@@ -0,0 +1,162 @@
+import os
+import signal
+import threading
+import time
+import unittest
+from unittest import mock
+
+from llama_deploy import health, log, orchestrator
+from llama_deploy.config import ModelSpec
+from llama_deploy.log import Cancelled, check_cancelled
+from llama_deploy.orchestrator import Step, _TqdmStub, _bind_tqdm, run_steps
+
+
+class OrchestratorRunStepsTests(unittest.TestCase):
+    def test_parallel_group_runs_steps_concurrently(self) -> None:
+        barrier = threading.Barrier(2, timeout=5)
+
+        def _both_running(value: str):
+            # Only passes if both group members are in flight at the same time.
+            barrier.wait()
+            return value
+
+        order: list = []
+        steps = [
+            Step("serial", lambda: order.append("serial")),
+            Step("a", lambda: _both_running("A"), parallel_group="downloads"),
+            Step("b", lambda: _both_running("B"), parallel_group="downloads"),
+            Step("skipped", lambda: "never", skip_if=lambda: True, parallel_group="downloads"),
+            Step("after", lambda: order.append("after")),
+        ]
+        with mock.patch("llama_deploy.log.log_line"):
+            run_steps(steps, _TqdmStub())
+
+        self.assertEqual(order, ["serial", "after"])
+        self.assertEqual(steps[1].result, "A")
+        self.assertEqual(steps[2].result, "B")
+        self.assertIsNone(steps[3].result)
+
+    def _abort_group(self, trigger) -> BaseException:
+        # "slow" stands in for a download: it only ends early if cancelled.
+        started = threading.Event()
+        seen: list = []
+
+        def _slow():
+            started.set()
+            try:
+                deadline = time.monotonic() + 10
+                while time.monotonic() < deadline:
+                    check_cancelled()
+                    time.sleep(0.01)
+            except Cancelled:
+                seen.append("cancelled")
+                raise
+
+        steps = [
+            Step("slow", _slow, parallel_group="downloads"),
+            Step("other", lambda: trigger(started), parallel_group="downloads"),
+        ]
+        t0 = time.monotonic()
+        with mock.patch("llama_deploy.log.log_line"):
+            with self.assertRaises((KeyboardInterrupt, SystemExit)) as ctx:
+                run_steps(steps, _TqdmStub())
+        self.assertLess(time.monotonic() - t0, 3)
+        for _ in range(200):
+            if seen:
+                break
+            time.sleep(0.01)
+        self.assertEqual(seen, ["cancelled"])
+        return ctx.exception
+
+    def test_ctrl_c_aborts_running_group_at_once(self) -> None:
+        def _interrupt_once_running(started):
+            started.wait(5)
+            threading.Timer(0.1, os.kill, (os.getpid(), signal.SIGINT)).start()
+            time.sleep(0.3)
+
+        exc = self._abort_group(_interrupt_once_running)
+        self.assertIsInstance(exc, KeyboardInterrupt)
+
+    def test_failing_step_cancels_its_siblings(self) -> None:
+        def _die(started):
+            started.wait(5)
+            raise SystemExit(1)
+
+        exc = self._abort_group(_die)
+        self.assertIsInstance(exc, SystemExit)
+
+    def test_deferred_step_finishes_on_main_thread_after_group(self) -> None:
+        threads: list = []
+
+        def _needs_prompt():
+            raise orchestrator._DeferToMain(lambda: threads.append(threading.current_thread()) or "R")
+
+        steps = [
+            Step("prompt", _needs_prompt, parallel_group="downloads"),
+            Step("other", lambda: time.sleep(0.1) or "O", parallel_group="downloads"),
+        ]
+        with mock.patch("llama_deploy.log.log_line"):
+            run_steps(steps, _TqdmStub())
+
+        self.assertEqual(threads, [threading.main_thread()])
+        self.assertEqual([s.result for s in steps], ["R", "O"])
+
+    def test_model_retry_prompt_is_deferred_out_of_group_worker(self) -> None:
+        cfg = mock.Mock(models_dir="/tmp", hf_token=None, allow_unverified_downloads=False)
+        spec = ModelSpec(hf_repo="org/repo", candidate_patterns=["Q4_K_M"], ctx_len=2048)
+        with mock.patch("sys.stdin.isatty", return_value=True), \
+             mock.patch("llama_deploy.model.resolve_model", side_effect=SystemExit(1)), \
+             mock.patch("builtins.input") as ask:
+            log.set_cancel_event(threading.Event())
+            try:
+                with self.assertRaises(orchestrator._DeferToMain):
+                    orchestrator._resolve_model_with_retry(cfg, spec, "LLM")
+            finally:
+                log.set_cancel_event(None)
+            ask.assert_not_called()
+
+
+class BindTqdmTests(unittest.TestCase):
+    def test_bind_rebinds_log_and_health(self) -> None:
+        with mock.patch.object(log, "TQDM"), mock.patch.object(health, "TQDM"), \
+             mock.patch.object(orchestrator, "tqdm"):
+            _bind_tqdm(_TqdmStub)
+            self.assertIs(log.TQDM, _TqdmStub)
+            self.assertIs(health.TQDM, _TqdmStub)
+            self.assertIs(orchestrator.tqdm, _TqdmStub)
+
+
+class AptUpdateOnceTests(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.object(orchestrator, "_APT_UPDATED", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _update(self, lists_age_s: float, calls: int = 1) -> mock.Mock:
+        now = 1_700_000_000.0
+        with mock.patch("llama_deploy.orchestrator.subprocess.run") as run, \
+             mock.patch("llama_deploy.orchestrator.os.path.getmtime", return_value=now - lists_age_s), \
+             mock.patch("llama_deploy.orchestrator.time.time", return_value=now):
+            for _ in range(calls):
+                orchestrator._apt_update_once()
+        return run
+
+    def test_update_runs_once_per_process(self) -> None:
+        run = self._update(lists_age_s=7200, calls=3)
+        run.assert_called_once()
+        self.assertIn("apt-get update", run.call_args.args[0][-1])
+
+    def test_fresh_lists_skip_update(self) -> None:
+        run = self._update(lists_age_s=600)
+        run.assert_not_called()
+        self.assertTrue(orchestrator._APT_UPDATED)
+
+    def test_missing_lists_force_update(self) -> None:
+        with mock.patch("llama_deploy.orchestrator.subprocess.run") as run, \
+             mock.patch("llama_deploy.orchestrator.os.path.getmtime", side_effect=FileNotFoundError):
+            orchestrator._apt_update_once()
+        run.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
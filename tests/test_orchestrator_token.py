@@ -1,10 +1,13 @@
 import tempfile
+import threading
+import time
 import unittest
 from pathlib import Path
 from types import SimpleNamespace
+from unittest import mock
 
-from llama_deploy.config import AuthMode
-from llama_deploy.orchestrator import _ensure_first_token
+from llama_deploy.config import AuthMode, BackendKind, Config, ModelSpec, NetworkConfig
+from llama_deploy.orchestrator import TokenRuntime, _ensure_first_token, run_deploy
 from llama_deploy.tokens import TokenStore
 
 
@@ -49,5 +52,89 @@ class OrchestratorTokenTests(unittest.TestCase):
             self.assertIsNotNone(runtime.temporary_id)
 
 
+
+class RunDeployRevocationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        td = tempfile.TemporaryDirectory()
+        self.addCleanup(td.cleanup)
+        self.cfg = Config(
+            base_dir=Path(td.name),
+            backend=BackendKind.CPU,
+            network=NetworkConfig(bind_host="127.0.0.1", port=8080, publish=True),
+            swap_gib=0,
+            models_max=2,
+            parallel=1,
+            api_token=None,
+            api_token_name="default",
+            hf_token=None,
+            skip_download=False,
+            llm=ModelSpec(hf_repo="Qwen/Qwen3-8B-GGUF", candidate_patterns=["Q4_K_M"], ctx_len=2048),
+            emb=ModelSpec(hf_repo="Qwen/Qwen3-Embedding-0.6B-GGUF", candidate_patterns=["Q8_0"],
+                          ctx_len=2048, is_embedding=True),
+            auto_optimize=False,
+        )
+        self.release = threading.Event()
+        self.revoke_started = threading.Event()
+        self.store = mock.Mock()
+        self.store.active_tokens.return_value = []
+
+        def _blocking_revoke(token_id):
+            self.revoke_started.set()
+            self.release.wait(10)
+
+        self.store.revoke_token.side_effect = _blocking_revoke
+        self.addCleanup(self._join_revoker)
+
+    def _join_revoker(self) -> None:
+        self.release.set()
+        for t in threading.enumerate():
+            if t.name == "revoke-temp-token":
+                t.join(5)
+
+    def _run(self, fail_in_service_steps: bool) -> list:
+        calls = {"n": 0}
+
+        def _run_steps(steps, bar):
+            calls["n"] += 1
+            for step in steps:
+                if step.label == "Create API token":
+                    step.result = TokenRuntime(value="sk-temp", temporary_id="tmp-1")
+            if fail_in_service_steps and calls["n"] == 3:
+                raise SystemExit(1)
+
+        with mock.patch("llama_deploy.system.require_root_reexec"), \
+             mock.patch("llama_deploy.system.detect_ubuntu"), \
+             mock.patch("llama_deploy.system.ensure_apt_bundle"), \
+             mock.patch("llama_deploy.orchestrator._ensure_tqdm"), \
+             mock.patch("llama_deploy.tokens.TokenStore", return_value=self.store), \
+             mock.patch("llama_deploy.orchestrator.run_steps", side_effect=_run_steps), \
+             mock.patch("llama_deploy.orchestrator._print_summary"), \
+             mock.patch("llama_deploy.log.log_line") as log:
+            t0 = time.monotonic()
+            if fail_in_service_steps:
+                with self.assertRaises(SystemExit):
+                    run_deploy(self.cfg)
+            else:
+                run_deploy(self.cfg)
+            self.elapsed = time.monotonic() - t0
+        return [c.args[0] for c in log.call_args_list]
+
+    def test_slow_revocation_warns_after_bounded_wait(self) -> None:
+        logged = self._run(fail_in_service_steps=False)
+
+        self.assertTrue(self.revoke_started.is_set())
+        self.store.revoke_token.assert_called_once_with("tmp-1")
+        self.assertIn("[WARN] Token revocation still in progress at exit", logged)
+        self.assertLess(self.elapsed, 5)
+
+    def test_revocation_starts_when_deploy_fails(self) -> None:
+        self.release.set()
+        logged = self._run(fail_in_service_steps=True)
+
+        self.store.revoke_token.assert_called_once_with("tmp-1")
+        self.assertIn("[CLEANUP] revoked temporary smoke-test token (tmp-1)", logged)
+        self.assertNotIn("[WARN] Token revocation still in progress at exit", logged)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,4 +1,6 @@
+import shutil
 import tempfile
+import threading
 import unittest
 from dataclasses import replace
 from pathlib import Path
@@ -12,7 +14,7 @@ from llama_deploy.config import (
     ModelSpec,
     NetworkConfig,
 )
-from llama_deploy.service import write_compose, write_models_ini
+from llama_deploy.service import docker_pull, image_digest_fresh, write_compose, write_models_ini
 
 
 def _resolved(spec: ModelSpec, filename: str) -> ModelSpec:
@@ -130,6 +132,19 @@ class ServiceModelsIniTests(unittest.TestCase):
             self.assertIn("--models-preset /presets/models.ini", content)
             self.assertNotIn("--models-dir /models", content)
 
+    def test_compose_declares_router_healthcheck(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            base_dir = Path(td)
+            compose_path = base_dir / "docker-compose.yml"
+            for mode in (AuthMode.PLAINTEXT, AuthMode.HASHED):
+                cfg = replace(_cfg(base_dir), auth_mode=mode)
+                with mock.patch("llama_deploy.system.log_line"), \
+                     mock.patch("llama_deploy.system.backup_file"):
+                    write_compose(compose_path, cfg)
+                content = compose_path.read_text(encoding="utf-8")
+                self.assertIn("healthcheck:", content)
+                self.assertIn('"http://127.0.0.1:8080/health"', content)
+
     def test_bridge_mode_webui_does_not_require_compose_network(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             base_dir = Path(td)
@@ -169,5 +184,201 @@ class ServiceModelsIniTests(unittest.TestCase):
             self.assertNotIn("links:", content)
 
 
+class ImageDigestCacheTests(unittest.TestCase):
+    IMAGE = "ghcr.io/ggml-org/llama.cpp:server"
+
+    def _inspect(self, digest: str):
+        return mock.patch(
+            "llama_deploy.service.subprocess.run",
+            return_value=mock.Mock(stdout=digest + "\n"),
+        )
+
+    def test_pull_records_digest_and_skips_within_ttl(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            cache = Path(td)
+            with self._inspect("llama.cpp@sha256:aaa"):
+                self.assertFalse(image_digest_fresh(self.IMAGE, cache))
+                with mock.patch("llama_deploy.service.sh") as sh:
+                    docker_pull(self.IMAGE, cache)
+                sh.assert_called_once()
+                with mock.patch("llama_deploy.service.log_line"):
+                    self.assertTrue(image_digest_fresh(self.IMAGE, cache))
+                self.assertFalse(image_digest_fresh(self.IMAGE, cache, ttl_s=0))
+            # Local image replaced behind our back: digest no longer matches.
+            with self._inspect("llama.cpp@sha256:bbb"):
+                self.assertFalse(image_digest_fresh(self.IMAGE, cache))
+
+    def test_missing_local_image_is_never_fresh(self) -> None:
+        with tempfile.TemporaryDirectory() as td, self._inspect(""):
+            self.assertFalse(image_digest_fresh(self.IMAGE, Path(td)))
+
+
+class AuthSidecarScriptTests(unittest.TestCase):
+    def _sidecar(self, secrets: Path) -> dict:
+        from llama_deploy.service import _SIDECAR_SCRIPT
+        env = {
+            "HASHES_FILE": str(secrets / "token_hashes.json"),
+            "HASHES_BIN": str(secrets / "token_hashes.sorted.bin"),
+        }
+        ns: dict = {"__name__": "auth_sidecar"}
+        with mock.patch.dict("os.environ", env):
+            exec(compile(_SIDECAR_SCRIPT, "auth_sidecar.py", "exec"), ns)
+        return ns
+
+    def test_sidecar_accepts_only_active_tokens(self) -> None:
+        from llama_deploy.tokens import TokenStore
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.HASHED)
+            keep = store.create_token("keep")
+            gone = store.create_token("gone")
+            store.revoke_token(gone.id)
+            sidecar = self._sidecar(secrets)
+
+            self.assertTrue(sidecar["_is_authorized"](keep.value))
+            self.assertFalse(sidecar["_is_authorized"](gone.value))
+            self.assertFalse(sidecar["_is_authorized"]("sk-unknown"))
+
+            # Stores synced before token_hashes.sorted.bin existed still work via the JSON list.
+            (secrets / "token_hashes.sorted.bin").unlink()
+            self.assertTrue(sidecar["_is_authorized"](keep.value))
+            self.assertFalse(sidecar["_is_authorized"](gone.value))
+
+    def test_sidecar_bisects_many_tokens(self) -> None:
+        from llama_deploy.tokens import TokenStore
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.HASHED)
+            created = store.create_tokens([(f"t{i}", None) for i in range(40)])
+            store.revoke_tokens([t.id for t in created[::3]])
+            sidecar = self._sidecar(secrets)
+
+            for i, t in enumerate(created):
+                self.assertEqual(sidecar["_is_authorized"](t.value), i % 3 != 0)
+            self.assertFalse(sidecar["_is_authorized"]("sk-unknown"))
+
+            store.revoke_tokens([t.id for t in store.active_tokens()])
+            self.assertEqual((secrets / "token_hashes.sorted.bin").read_bytes(), b"")
+            self.assertFalse(sidecar["_is_authorized"](created[1].value))
+
+    def test_sidecar_reloads_on_inotify_events(self) -> None:
+        from llama_deploy.tokens import TokenStore
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.HASHED)
+            keep = store.create_token("keep")
+            sidecar = self._sidecar(secrets)
+            changed = threading.Event()
+
+            def _reload() -> None:
+                sidecar["_reload"]()
+                changed.set()
+
+            if not sidecar["watch_hashfiles"]([secrets / "token_hashes.sorted.bin"], _reload, mock.Mock()):
+                self.skipTest("inotify unavailable")
+            sidecar["_reload"]()
+            self.assertTrue(sidecar["_is_authorized"](keep.value))
+
+            with mock.patch("builtins.open", side_effect=AssertionError("re-read per request")):
+                self.assertTrue(sidecar["_is_authorized"](keep.value))
+            store.revoke_token(keep.id)
+            self.assertTrue(changed.wait(5))
+            self.assertFalse(sidecar["_is_authorized"](keep.value))
+
+    def _watch(self, directory: Path, callback, on_stale) -> None:
+        sidecar = self._sidecar(directory)
+        if not sidecar["watch_hashfiles"]([directory / "hashes.bin"], callback, on_stale):
+            self.skipTest("inotify unavailable")
+
+    def test_watch_survives_a_failing_callback(self) -> None:
+        calls: list = []
+        stale = threading.Event()
+        called_again = threading.Event()
+
+        def _callback() -> None:
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("reload failed")
+            called_again.set()
+
+        with tempfile.TemporaryDirectory() as td:
+            self._watch(Path(td), _callback, stale.set)
+            (Path(td) / "hashes.bin").write_bytes(b"")
+            self.assertTrue(stale.wait(5))
+            (Path(td) / "hashes.bin").write_bytes(b"")
+            self.assertTrue(called_again.wait(5))
+
+    def test_queue_overflow_triggers_reload(self) -> None:
+        entered, release, reloaded = threading.Event(), threading.Event(), threading.Event()
+        calls: list = []
+
+        def _callback() -> None:
+            calls.append(1)
+            if len(calls) == 1:
+                entered.set()
+                release.wait(5)  # hold the reader while the queue overflows
+            else:
+                reloaded.set()
+
+        with tempfile.TemporaryDirectory() as td:
+            self._watch(Path(td), _callback, mock.Mock())
+            (Path(td) / "hashes.bin").write_bytes(b"")
+            self.assertTrue(entered.wait(5))
+            limit = Path("/proc/sys/fs/inotify/max_queued_events")
+            n = int(limit.read_text()) + 100 if limit.exists() else 20000
+            for i in range(n):  # none name the watched file; alternate so none coalesce
+                (Path(td) / f"unrelated{i % 2}").write_bytes(b"")
+            release.set()
+            self.assertTrue(reloaded.wait(5))
+
+    def test_lost_watch_falls_back_to_per_request_reads(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            watched = Path(td) / "secrets"
+            watched.mkdir()
+            sidecar = self._sidecar(watched)
+            stale = threading.Event()
+
+            def _on_stale() -> None:
+                sidecar["_drop_state"]()
+                stale.set()
+
+            if not sidecar["watch_hashfiles"]([watched / "hashes.bin"], mock.Mock(), _on_stale):
+                self.skipTest("inotify unavailable")
+            sidecar["_reload"]()
+            self.assertIsNotNone(sidecar["_state"])
+            shutil.rmtree(watched)
+            self.assertTrue(stale.wait(5))
+            self.assertIsNone(sidecar["_state"])
+
+    def test_bloom_filter_short_circuits_unknown_tokens(self) -> None:
+        from llama_deploy.tokens import TokenStore
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.HASHED)
+            created = store.create_tokens([(f"t{i}", None) for i in range(20)])
+            sidecar = self._sidecar(secrets)
+            sidecar["_reload"]()
+
+            for t in created:
+                self.assertTrue(sidecar["_is_authorized"](t.value))
+            bisect = mock.Mock(wraps=sidecar["_bisect"])
+            with mock.patch.dict(sidecar, {"_bisect": bisect}):
+                for i in range(200):
+                    self.assertFalse(sidecar["_is_authorized"](f"sk-unknown-{i}"))
+            self.assertLess(bisect.call_count, 5)  # only Bloom false positives get this far
+
+
+class WebuiSecretTests(unittest.TestCase):
+    def test_secret_created_private_and_reused(self) -> None:
+        from llama_deploy.service import _load_or_create_webui_secret
+        with tempfile.TemporaryDirectory() as td, \
+             mock.patch("llama_deploy.service.os.chmod") as chmod:
+            key = _load_or_create_webui_secret(Path(td))
+            path = Path(td) / "secrets" / "webui_secret.key"
+            self.assertEqual(path.stat().st_mode & 0o777, 0o600)
+            self.assertEqual(_load_or_create_webui_secret(Path(td)), key)
+        chmod.assert_not_called()  # mode set at creation, no chmod window
+
+
 if __name__ == "__main__":
     unittest.main()
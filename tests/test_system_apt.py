@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+
+from llama_deploy import system
+
+
+def _dpkg(installed):
+    out = "".join(f"{name}\tii \n" for name in installed)
+    return mock.Mock(stdout=out)
+
+
+class AptBundleTests(unittest.TestCase):
+    def test_installs_only_missing_packages_in_one_transaction(self) -> None:
+        with mock.patch("llama_deploy.system.subprocess.run", return_value=_dpkg(["curl", "jq"])), \
+             mock.patch("llama_deploy.system.sh") as sh, \
+             mock.patch("llama_deploy.system.log_line"):
+            system.ensure_apt_bundle(["curl", "jq", "ufw", "python3-tqdm"])
+
+        cmds = [c.args[0] for c in sh.call_args_list]
+        self.assertEqual(len(cmds), 2)
+        self.assertIn("apt-get update", cmds[0])
+        self.assertTrue(cmds[1].endswith("apt-get install -y ufw python3-tqdm"))
+
+    def test_noop_when_everything_is_installed(self) -> None:
+        pkgs = list(system.BOOT_APT_PACKAGES)
+        with mock.patch("llama_deploy.system.subprocess.run", return_value=_dpkg(pkgs)), \
+             mock.patch("llama_deploy.system.sh") as sh, \
+             mock.patch("llama_deploy.system.log_line"):
+            system.ensure_apt_bundle(pkgs)
+            system.ensure_base_packages()
+
+        sh.assert_not_called()
+
+    def test_half_installed_package_counts_as_missing(self) -> None:
+        dpkg = mock.Mock(stdout="curl\tii \njq\tiF \n")
+        with mock.patch("llama_deploy.system.subprocess.run", return_value=dpkg):
+            self.assertEqual(system._missing_packages(["curl", "jq"]), ["jq"])
+
+    def test_optional_tqdm_is_not_in_fatal_boot_bundle(self) -> None:
+        self.assertNotIn("python3-tqdm", system.BOOT_APT_PACKAGES)
+        self.assertIn("unattended-upgrades", system.BOOT_APT_PACKAGES)
+
+
+if __name__ == "__main__":
+    unittest.main()
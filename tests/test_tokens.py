@@ -1,12 +1,21 @@
 import json
+import os
+import sys
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from llama_deploy.config import AuthMode
+from llama_deploy import tokens
 from llama_deploy.tokens import TokenStore
 
 
+def _log_lines(secrets: Path) -> list:
+    text = (secrets / "tokens.jsonl").read_text(encoding="utf-8")
+    return [json.loads(line) for line in text.splitlines()]
+
+
 class TokenStoreTests(unittest.TestCase):
     def test_plaintext_mode_persists_explicit_token_value(self) -> None:
         with tempfile.TemporaryDirectory() as td:
@@ -16,8 +25,8 @@ class TokenStoreTests(unittest.TestCase):
             record = store.create_token("app", value="sk-explicit-token")
             self.assertEqual(record.value, "sk-explicit-token")
 
-            saved = json.loads((secrets / "tokens.json").read_text(encoding="utf-8"))
-            self.assertEqual(saved["tokens"][0]["value"], "sk-explicit-token")
+            saved = _log_lines(secrets)
+            self.assertEqual(saved[0]["value"], "sk-explicit-token")
 
             keyfile = (secrets / "api_keys").read_text(encoding="utf-8")
             self.assertIn("sk-explicit-token", keyfile)
@@ -30,8 +39,7 @@ class TokenStoreTests(unittest.TestCase):
             record = store.create_token("app", value="sk-secret-token")
             self.assertEqual(record.value, "sk-secret-token")
 
-            saved = json.loads((secrets / "tokens.json").read_text(encoding="utf-8"))
-            token = saved["tokens"][0]
+            token = _log_lines(secrets)[0]
             self.assertIsNone(token["value"])
             self.assertTrue(token["hash"])
 
@@ -41,6 +49,208 @@ class TokenStoreTests(unittest.TestCase):
             with self.assertRaises(ValueError):
                 store.show_token(record.id)
 
+    def test_parsed_tokens_cached_until_file_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            first = store.create_token("one")
+
+            with mock.patch("llama_deploy.tokens._json_loads", wraps=tokens._json_loads) as loads:
+                self.assertEqual([t.id for t in store.active_tokens()], [first.id])
+                store.list_tokens()
+                store.show_token(first.id)
+                second = store.create_token("two")
+                store.revoke_token(first.id)
+                self.assertEqual([t.id for t in store.active_tokens()], [second.id])
+                loads.assert_not_called()
+
+            # Another process (e.g. `tokens create` from the CLI) rewrites the file.
+            other = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            third = other.create_token("three")
+            self.assertEqual([t.id for t in store.active_tokens()], [second.id, third.id])
+
+    def test_lookup_by_id_after_create_and_revoke(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            store = TokenStore(Path(td) / "secrets", auth_mode=AuthMode.PLAINTEXT)
+            ids = [store.create_token(f"t{i}").id for i in range(5)]
+
+            self.assertEqual(store.show_token(ids[3]).name, "t3")
+            self.assertTrue(store.revoke_token(ids[2]).revoked)
+            with self.assertRaises(ValueError):
+                store.revoke_token(ids[2])
+            with self.assertRaises(KeyError):
+                store.show_token("tk_missing")
+            with self.assertRaises(KeyError):
+                store.revoke_token("tk_missing")
+
+    def test_writes_are_atomic_and_private(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            for mode, keyfiles in (
+                (AuthMode.PLAINTEXT, ["api_keys"]),
+                (AuthMode.HASHED, ["token_hashes.json", "token_hashes.sorted.bin"]),
+            ):
+                store = TokenStore(secrets, auth_mode=mode)
+                with mock.patch("llama_deploy.tokens.os.fsync", wraps=os.fsync) as fsync:
+                    store.create_token("app")
+                # tokens.jsonl append + keyfile(s) + the secrets dir itself
+                self.assertEqual(fsync.call_count, 2 + len(keyfiles))
+                for name in ["tokens.jsonl", *keyfiles]:
+                    self.assertEqual((secrets / name).stat().st_mode & 0o777, 0o600)
+            self.assertEqual(list(secrets.glob("*.tmp")), [])
+
+    def test_batch_create_and_revoke_write_each_file_once(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.HASHED)
+            with mock.patch("llama_deploy.tokens._atomic_write", wraps=tokens._atomic_write) as write:
+                created = store.create_tokens([("a", None), ("b", "sk-bee"), ("c", None)])
+            self.assertEqual(write.call_count, 2)  # token_hashes.json/.bin; the log is appended
+            self.assertEqual([t.name for t in created], ["a", "b", "c"])
+            self.assertEqual(created[1].value, "sk-bee")
+            self.assertEqual(len({t.created_at for t in created}), 1)
+
+            with self.assertRaises(KeyError):
+                store.revoke_tokens([created[0].id, "tk_missing"])
+            self.assertEqual(len(store.active_tokens()), 3)  # nothing revoked
+
+            with mock.patch("llama_deploy.tokens._atomic_write", wraps=tokens._atomic_write) as write:
+                store.revoke_tokens([created[0].id, created[2].id])
+            # hash files, then compact() folds the two tombstones (5 lines > 1.5 * 3)
+            self.assertEqual(write.call_count, 3)
+            self.assertEqual(len(_log_lines(secrets)), 3)
+            self.assertEqual([t.id for t in store.active_tokens()], [created[1].id])
+            hashes = json.loads((secrets / "token_hashes.json").read_text(encoding="utf-8"))
+            self.assertEqual(len(hashes["hashes"]), 1)
+
+    def test_log_appends_tombstones_and_compacts(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            ids = [t.id for t in store.create_tokens([(f"t{i}", None) for i in range(4)])]
+
+            store.revoke_token(ids[0])
+            lines = _log_lines(secrets)
+            self.assertEqual(lines[-1]["id"], ids[0])
+            self.assertTrue(lines[-1]["revoke"])
+            self.assertEqual(len(lines), 5)  # appended, not rewritten
+
+            # A fresh reader folds the tombstone into the record.
+            fresh = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            self.assertTrue(fresh.show_token(ids[0]).revoked)
+            self.assertIsNotNone(fresh.show_token(ids[0]).revoked_at)
+
+            store.revoke_tokens(ids[1:3])  # 7 lines > 1.5 * 4 -> compacted
+            lines = _log_lines(secrets)
+            self.assertEqual([d["id"] for d in lines], ids)
+            self.assertEqual([d["revoked"] for d in lines], [True, True, True, False])
+            self.assertFalse(store.compact())
+
+    def test_torn_trailing_append_is_ignored(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            keep = store.create_token("keep")
+            with (secrets / "tokens.jsonl").open("a", encoding="utf-8") as fh:
+                fh.write('{"id": "tk_torn", "na')
+            fresh = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            self.assertEqual([t.id for t in fresh.list_tokens()], [keep.id])
+
+    def test_append_after_torn_tail_keeps_log_readable(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            keep = store.create_token("keep")
+            with (secrets / "tokens.jsonl").open("a", encoding="utf-8") as fh:
+                fh.write('{"id":"tk_torn","na')
+            after = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT).create_token("b")
+
+            fresh = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            self.assertEqual([t.id for t in fresh.list_tokens()], [keep.id, after.id])
+            raw = (secrets / "tokens.jsonl").read_bytes()
+            self.assertIn(b'{"id":"tk_torn","na\n', raw)
+
+    def test_legacy_tokens_json_is_migrated(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            secrets.mkdir()
+            legacy = {"tokens": [
+                {"id": "tk_old", "name": "old", "created_at": "2024-01-01T00:00:00+00:00",
+                 "revoked": True, "revoked_at": "2024-02-01T00:00:00+00:00", "value": "sk-old"},
+                {"id": "tk_live", "name": "live", "created_at": "2024-01-02T00:00:00+00:00",
+                 "value": "sk-live"},
+            ]}
+            (secrets / "tokens.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+            store = TokenStore(secrets, auth_mode=AuthMode.PLAINTEXT)
+            self.assertEqual([t.id for t in store.active_tokens()], ["tk_live"])
+            self.assertFalse((secrets / "tokens.json").exists())
+            self.assertEqual([d["id"] for d in _log_lines(secrets)], ["tk_old", "tk_live"])
+            self.assertEqual(store.show_token("tk_old").revoked_at, "2024-02-01T00:00:00+00:00")
+
+    def test_create_appends_to_existing_keyfile(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets)
+            first = store.create_token("first")  # no keyfile yet -> full sync
+            with mock.patch.object(store, "_sync", wraps=store._sync) as sync:
+                second = store.create_token("second")
+                sync.assert_not_called()
+                store.revoke_token(first.id)
+                sync.assert_called_once()
+            self.assertEqual((secrets / "api_keys").read_text(encoding="utf-8"), second.value + "\n")
+
+    def test_hash_bin_is_sorted(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            secrets = Path(td) / "secrets"
+            store = TokenStore(secrets, auth_mode=AuthMode.HASHED)
+            created = store.create_tokens([(f"t{i}", None) for i in range(5)])
+            created.append(store.create_token("late"))
+            store.revoke_token(created[0].id)
+
+            raw = (secrets / "token_hashes.sorted.bin").read_bytes()
+            digests = [raw[i:i + 32] for i in range(0, len(raw), 32)]
+            self.assertEqual(digests, sorted(t.hash for t in created[1:]))
+            raw_json = (secrets / "token_hashes.json").read_bytes()
+            self.assertEqual(json.loads(raw_json)["hashes"], [t.hash.hex() for t in created[1:]])
+            self.assertNotIn(b" ", raw_json)  # compact: the file is machine-read
+
+    def test_to_dict_covers_every_field(self) -> None:
+        from dataclasses import asdict
+        from llama_deploy.tokens import TokenRecord
+        rec = TokenRecord(id="tk_1", name="n", created_at="c", revoked=True,
+                          revoked_at="r", value="v", hash=b"\xab" * 32)
+        self.assertEqual(rec._to_dict(), {**asdict(rec), "hash": "ab" * 32})
+        self.assertEqual(TokenRecord._from_dict(rec._to_dict()), rec)
+
+    @unittest.skipIf(sys.version_info < (3, 10), "dataclass(slots=True) needs 3.10+")
+    def test_record_has_no_instance_dict(self) -> None:
+        from llama_deploy.tokens import TokenRecord
+        rec = TokenRecord(id="tk_1", name="n", created_at="c")
+        self.assertFalse(hasattr(rec, "__dict__"))
+        self.assertEqual(rec.status, "active")
+
+    def test_generated_ids_and_values_keep_their_format(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            store = TokenStore(Path(td) / "secrets")
+            created = store.create_tokens([(f"t{i}", None) for i in range(3)])
+        for t in created:
+            self.assertRegex(t.id, r"^tk_[0-9a-f]{12}$")
+            self.assertRegex(t.value, r"^sk-[A-Za-z0-9_-]{64}$")
+        self.assertEqual(len({t.value for t in created}), 3)
+
+    def test_failed_revoke_leaves_cache_untouched(self) -> None:
+        import errno
+        with tempfile.TemporaryDirectory() as td:
+            store = TokenStore(Path(td) / "secrets")
+            t = store.create_token("app")
+            full = OSError(errno.ENOSPC, "No space left on device")
+            with mock.patch("llama_deploy.tokens.os.write", side_effect=full):
+                with self.assertRaises(OSError):
+                    store.revoke_token(t.id)
+            self.assertFalse(store.show_token(t.id).revoked)
+            self.assertEqual([x.id for x in store.active_tokens()], [t.id])
+
 
 if __name__ == "__main__":
     unittest.main()